@@ -0,0 +1,157 @@
+"""Fair, bounded scheduler for intent handlers.
+
+Each guild gets a FIFO queue. Jobs start in round-robin order across guilds,
+limited both per guild (SCHEDULER_GUILD_CONCURRENCY) and overall
+(SCHEDULER_MAX_CONCURRENCY), so a busy guild cannot starve the others. A full
+guild queue rejects new work with SchedulerBusy. Queued or running jobs can be
+cancelled per (guild, channel, user), which is what !exit does.
+"""
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Set, Tuple
+
+logger = logging.getLogger("command_scheduler")
+
+SCHEDULER_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "16"))
+SCHEDULER_GUILD_CONCURRENCY = int(os.getenv("SCHEDULER_GUILD_CONCURRENCY", "2"))
+SCHEDULER_GUILD_QUEUE_SIZE = int(os.getenv("SCHEDULER_GUILD_QUEUE_SIZE", "20"))
+
+Owner = Tuple[int, int] # (channel_id, user_id)
+
+class SchedulerBusy(Exception):
+    """The guild's queue is full; the caller should ask the user to retry."""
+
+class Job:
+    __slots__ = ("guild_id", "owner", "factory", "task", "outcome")
+
+    def __init__(self, guild_id: int, owner: Owner, factory: Callable[[], Awaitable[Any]]):
+        self.guild_id = guild_id
+        self.owner = owner
+        self.factory = factory
+        self.task = None
+        # Resolves to True when the handler finishes, False if the job was cancelled
+        self.outcome = asyncio.get_running_loop().create_future()
+
+class CommandScheduler:
+    """Per-guild FIFO queues drained round-robin under global and per-guild limits."""
+
+    def __init__(self, max_concurrency: int = SCHEDULER_MAX_CONCURRENCY,
+                 guild_concurrency: int = SCHEDULER_GUILD_CONCURRENCY,
+                 guild_queue_size: int = SCHEDULER_GUILD_QUEUE_SIZE):
+        self.max_concurrency = max_concurrency
+        self.guild_concurrency = guild_concurrency
+        self.guild_queue_size = guild_queue_size
+        self._queues: Dict[int, Deque[Job]] = {}
+        self._ring: Deque[int] = deque() # guilds with queued jobs, in round-robin order
+        self._running: Dict[int, Set[Job]] = {}
+        self._active = 0
+        self.rejected = 0
+
+    def submit(self, guild_id: int, owner: Owner, factory: Callable[[], Awaitable[Any]]) -> Job:
+        """Queue factory() to run for owner in guild_id; raises SchedulerBusy when the queue is full."""
+        queue = self._queues.get(guild_id)
+        if queue is None:
+            queue = self._queues[guild_id] = deque()
+        if len(queue) >= self.guild_queue_size:
+            self.rejected += 1
+            raise SchedulerBusy(f"{len(queue)} commands are already queued for guild {guild_id}")
+        job = Job(guild_id, owner, factory)
+        queue.append(job)
+        if len(queue) == 1:
+            self._ring.append(guild_id)
+        self._pump()
+        return job
+
+    async def run(self, guild_id: int, owner: Owner, factory: Callable[[], Awaitable[Any]]) -> bool:
+        """Submit and wait; returns False if the job was cancelled before finishing."""
+        job = self.submit(guild_id, owner, factory)
+        try:
+            return await job.outcome
+        except asyncio.CancelledError:
+            self._cancel_job(job)
+            raise
+
+    def cancel(self, guild_id: int, owner: Owner) -> int:
+        """Cancel owner's queued and running jobs in guild_id; returns how many were cancelled."""
+        cancelled = 0
+        queue = self._queues.get(guild_id)
+        if queue:
+            for job in [job for job in queue if job.owner == owner]:
+                self._cancel_job(job)
+                cancelled += 1
+        for job in list(self._running.get(guild_id, ())):
+            if job.owner == owner:
+                self._cancel_job(job)
+                cancelled += 1
+        return cancelled
+
+    def _cancel_job(self, job: Job) -> None:
+        if job.task is not None:
+            job.task.cancel() # _finished() resolves the outcome and frees the slot
+            return
+        queue = self._queues.get(job.guild_id)
+        if queue and job in queue:
+            queue.remove(job)
+            if not queue:
+                self._forget_queue(job.guild_id)
+        if not job.outcome.done():
+            job.outcome.set_result(False)
+
+    def _forget_queue(self, guild_id: int) -> None:
+        del self._queues[guild_id]
+        try:
+            self._ring.remove(guild_id)
+        except ValueError:
+            pass
+
+    def _pump(self) -> None:
+        # Visit guilds in ring order; a guild at its own limit is skipped until one of its jobs ends
+        blocked = 0
+        while self._ring and self._active < self.max_concurrency and blocked < len(self._ring):
+            guild_id = self._ring.popleft()
+            running = self._running.setdefault(guild_id, set())
+            if len(running) >= self.guild_concurrency:
+                self._ring.append(guild_id)
+                blocked += 1
+                continue
+            blocked = 0
+            queue = self._queues[guild_id]
+            job = queue.popleft()
+            if queue:
+                self._ring.append(guild_id)
+            else:
+                del self._queues[guild_id]
+            self._start(job, running)
+
+    def _start(self, job: Job, running: Set[Job]) -> None:
+        running.add(job)
+        self._active += 1
+        job.task = asyncio.ensure_future(job.factory())
+        job.task.add_done_callback(lambda task, job=job: self._finished(job))
+
+    def _finished(self, job: Job) -> None:
+        self._active -= 1
+        running = self._running.get(job.guild_id)
+        if running is not None:
+            running.discard(job)
+            if not running:
+                del self._running[job.guild_id]
+        task = job.task
+        if not job.outcome.done():
+            if task.cancelled():
+                job.outcome.set_result(False)
+            elif task.exception() is not None:
+                job.outcome.set_exception(task.exception())
+            else:
+                job.outcome.set_result(True)
+        self._pump()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._active,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "guilds": len(set(self._queues) | set(self._running)),
+            "rejected": self.rejected
+        }
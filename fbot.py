@@ -1,20 +1,58 @@
+from dotenv import load_dotenv
+
+# Load the environment before importing modules that read their config at import time
+load_dotenv(dotenv_path='C:/Users/Hrida/OneDrive/Documents/Desktop/Avni_College/foss_p/tesserx/data.env')
+
 import discord
 from discord.ext import commands
-from pymongo import MongoClient
-from fmodel import predict, INTENTS_LIST
+from mongo_connection import DatabaseUnavailable, MongoConnection, MONGO_BREAKER_RESET_SECONDS
+from team_repository import TeamRepository
+from team_directory import TeamDirectory
+from command_scheduler import CommandScheduler, SchedulerBusy
+from message_dedup import RecentMessages
+from outbound import OutboundDispatcher
+import shard_status
+from wizard_sessions import SessionLimitReached, SessionManager, SessionStore, session_key
+from team_io import FORMATS, detect_format, export_teams, import_teams, parse_rows
+from fmodel import predict_async, InferenceQueueFull, INTENTS_LIST, start_model_loading, get_model_status
+from inference_client import INFERENCE_SERVER, InferenceClient
 import asyncio
+import csv
+import io
 import random
+import tempfile
 import os
 from datetime import datetime
-from dotenv import load_dotenv
 import logging
 import re
+import signal
 
-load_dotenv(dotenv_path='C:/Users/Hrida/OneDrive/Documents/Desktop/Avni_College/foss_p/tesserx/data.env')
+SHUTDOWN_FLUSH_SECONDS = 5
+
+class TeamBot(commands.AutoShardedBot):
+    async def setup_hook(self):
+        # shard_launcher and deploys stop the bot with SIGTERM; close cleanly so nothing queued is lost
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(self.close()))
+        except NotImplementedError: # Windows
+            signal.signal(signal.SIGTERM, lambda *_: loop.call_soon_threadsafe(lambda: asyncio.create_task(self.close())))
+
+    async def close(self):
+        """Send queued replies and write pending wizard checkpoints before disconnecting."""
+        if not self.is_closed():
+            logger.info("Shutting down: flushing queued replies and wizard checkpoints...")
+            await outbound.flush(SHUTDOWN_FLUSH_SECONDS)
+            await wizard_sessions.store.flush()
+        await super().close()
 
 intents = discord.Intents.default()
 intents.message_content = True
-client = commands.Bot(command_prefix="!", intents=intents)
+# SHARD_COUNT/SHARD_IDS are set per process by shard_launcher.py; unset runs every shard here
+client = TeamBot(
+    command_prefix="!", intents=intents,
+    shard_count=shard_status.SHARD_COUNT, shard_ids=shard_status.SHARD_IDS
+)
 
 # Configure logging
 logging.basicConfig(
@@ -26,28 +64,105 @@ logging.basicConfig(
 )
 logger = logging.getLogger("bot2")
 
-# Global variables for team creation process
-TEAM_CREATION_USER = None
-TEAM_CREATION_DATA = {}
+# Team creation wizard: one session per (guild, channel, user)
 TEAM_CREATION_FIELDS = ["team_name", "role", "members", "repo", "status"]
-TEAM_CREATION_INDEX = 0
-
-# Global variable to track if a command is being executed
-IS_COMMAND_RUNNING = False
+TEAM_CREATION_FIRST_PROMPT = f"Alright, let's get a new team set up! First, what will be the **{TEAM_CREATION_FIELDS[0].replace('_', ' ')}**?"
+
+async def notify_wizard_expired(session):
+    channel = client.get_channel(session.key[1])
+    if channel is not None:
+        await outbound.send(channel, f"⌛ <@{session.key[2]}>, your team creation timed out. Say `create a new team` to start again.")
+
+# Intent handlers run through a per-guild, round-robin scheduler so `!exit` can cancel them
+command_scheduler = CommandScheduler()
+
+# Every reply goes through per-channel, rate-budgeted queues that merge back-to-back sends
+outbound = OutboundDispatcher()
+
+# With INFERENCE_SERVER set, a shared inference_server.py process runs the models instead of this one
+inference = InferenceClient() if INFERENCE_SERVER else None
+
+# Message ids already handled, so gateway replays after a reconnect are ignored
+recent_messages = RecentMessages()
+
+async def end_wizard(message) -> bool:
+    """End the author's wizard in this channel, including one saved before a restart."""
+    key = session_key(message)
+    return await wizard_sessions.resume(key) is not None and wizard_sessions.end(key) is not None
+
+def cancel_running_commands(message) -> int:
+    """Cancel the author's queued and running commands in this channel."""
+    return command_scheduler.cancel(message.guild.id if message.guild else 0, (message.channel.id, message.author.id))
+
+TEAM_IMPORT_MAX_BYTES = int(os.getenv("TEAM_IMPORT_MAX_BYTES", str(5 * 1024 * 1024)))
+TEAM_IMPORT_ERRORS_SHOWN = 10
+
+# The client connects lazily; on_ready probes it and the breaker guards every query
+mongo = MongoConnection()
+db = mongo.db
+teams = TeamRepository(db["teams"], db["memberships"], breaker=mongo.breaker)
+directory = TeamDirectory(teams)
+# Wizard progress is checkpointed to MongoDB and resumed on the user's next message after a restart
+wizard_sessions = SessionManager(
+    TEAM_CREATION_FIELDS, on_expire=notify_wizard_expired,
+    store=SessionStore(db["wizard_sessions"], breaker=mongo.breaker)
+)
+database_setup_task = None
+shard_status_task = None
 
-try:
-    mongo_client = MongoClient("mongodb://localhost:27017/")
-    db = mongo_client["discord_bot"]
-    collection = db["Data"]
-    logger.info("✅ Successfully connected to MongoDB")
-except Exception as e:
-    logger.error(f"❌ MongoDB connection error: {e}")
+def db_error_message(e: Exception) -> str:
+    """User-facing text for a failed database call."""
+    if isinstance(e, DatabaseUnavailable):
+        return "⚠️ The team database is unavailable right now. Please try again in a minute."
+    return f"❌ Database error: {e}"
 
 @client.event
 async def on_ready():
     await client.change_presence(activity=discord.Activity(type=discord.ActivityType.listening, name="commands | !ping"))
     logger.info(f"✅ {client.user} is online | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info(f"Connected to {len(client.guilds)} server(s)")
+    wizard_sessions.start_sweeper()
+    global database_setup_task, shard_status_task
+    if database_setup_task is None:
+        database_setup_task = asyncio.create_task(prepare_database())
+    if shard_status_task is None:
+        shard_status_task = asyncio.create_task(publish_shard_status())
+
+@client.event
+async def on_shard_ready(shard_id):
+    logger.info(f"✅ Shard {shard_id} ready with {sum(1 for g in client.guilds if g.shard_id == shard_id)} guild(s)")
+
+async def publish_shard_status():
+    """Periodically record this process's shard latency and guild counts in MongoDB."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, mongo.breaker.call, shard_status.publish, db["shard_status"], shard_status.collect(client))
+        except Exception as e:
+            logger.warning(f"Could not publish shard status: {e}")
+        await asyncio.sleep(shard_status.SHARD_STATUS_INTERVAL_SECONDS)
+
+async def prepare_database():
+    """Wait until MongoDB answers a ping, then create indexes and load the team directory."""
+    while not await mongo.probe():
+        await asyncio.sleep(MONGO_BREAKER_RESET_SECONDS)
+    try:
+        await teams.ensure_indexes()
+    except Exception as e:
+        logger.error(f"❌ Could not create team indexes: {e}")
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, mongo.breaker.call, shard_status.ensure_indexes, db["shard_status"])
+    except Exception as e:
+        logger.error(f"❌ Could not create the shard status TTL index: {e}")
+    try:
+        await wizard_sessions.store.ensure_indexes()
+        await wizard_sessions.store.load_ids()
+    except Exception as e:
+        logger.error(f"❌ Could not prepare wizard session checkpoints: {e}")
+    try:
+        await directory.start()
+    except Exception as e:
+        logger.error(f"❌ Could not load the team directory, reading teams from MongoDB instead: {e}")
 
 @client.command()
 async def ping(ctx):
@@ -56,8 +171,16 @@ async def ping(ctx):
         description=f"Bot latency: {round(client.latency * 1000)}ms",
         color=discord.Color.green()
     )
+    if inference is None:
+        model_status = get_model_status()
+    else:
+        server_status = await inference.status()
+        model_status = server_status["model"] if server_status else {"ready": False, "state": "server unreachable"}
+    embed.add_field(name="ML models", value="ready" if model_status["ready"] else f"{model_status['state']} (regex-only mode)", inline=True)
+    breaker_state = mongo.breaker.state
+    embed.add_field(name="Database", value="ok" if breaker_state == "closed" else f"{breaker_state} (failing fast)", inline=True)
     embed.set_footer(text=f"Requested by {ctx.author.display_name}")
-    await ctx.send(embed=embed)
+    await outbound.send(ctx.channel, embed=embed)
 
 @client.command()
 async def start(ctx):
@@ -65,45 +188,183 @@ async def start(ctx):
     global bot_paused
     if 'bot_paused' in globals() and bot_paused:
         bot_paused = False
-        await ctx.send("Bot has been resumed. I will now process messages.")
+        await outbound.send(ctx.channel, "Bot has been resumed. I will now process messages.")
     else:
-        await ctx.send("Bot is already running.")
+        await outbound.send(ctx.channel, "Bot is already running.")
 
 @client.command()
 async def end(ctx):
     """Pauses the bot, ignoring new messages."""
     global bot_paused
     bot_paused = True
-    await ctx.send("Bot has been paused. I will not process new messages until '!start' is used.")
+    await outbound.send(ctx.channel, "Bot has been paused. I will not process new messages until '!start' is used.")
 
 @client.command()
 async def exit(ctx):
     """Exits the current command execution."""
-    global IS_COMMAND_RUNNING, TEAM_CREATION_USER, TEAM_CREATION_DATA, TEAM_CREATION_INDEX
-    if IS_COMMAND_RUNNING:
-        IS_COMMAND_RUNNING = False
-        await ctx.send("⌚❌ Exiting current operation - Execution Aborted!")
-        TEAM_CREATION_USER = None
-        TEAM_CREATION_DATA = {}
-        TEAM_CREATION_INDEX = 0
+    if await end_wizard(ctx.message):
+        await outbound.send(ctx.channel, "🚪 Team creation process has been cancelled.")
+    elif cancel_running_commands(ctx.message):
+        await outbound.send(ctx.channel, "⌚❌ Exiting current operation - Execution Aborted!")
     else:
-        await ctx.send("⚠️ No command is currently running to exit.")
+        await outbound.send(ctx.channel, "⚠️ No command is currently running to exit.")
 
 @client.command()
 async def reset(ctx):
-    """Resets any ongoing team creation process."""
-    global TEAM_CREATION_USER, TEAM_CREATION_DATA, TEAM_CREATION_INDEX
-    if ctx.author.guild_permissions.administrator or ctx.author.guild_permissions.manage_guild:
-        old_user = TEAM_CREATION_USER
-        TEAM_CREATION_USER = None
-        TEAM_CREATION_DATA = {}
-        TEAM_CREATION_INDEX = 0
-        if old_user:
-            await ctx.send("✅ Successfully reset the ongoing team creation process.")
+    """Resets every ongoing team creation process in this server."""
+    if is_team_admin(ctx.author):
+        try:
+            reset_count = await wizard_sessions.end_guild(ctx.guild.id if ctx.guild else 0)
+        except Exception as e:
+            logger.error(f"Error resetting team creation sessions: {e}")
+            await outbound.send(ctx.channel, db_error_message(e))
+            return
+        if reset_count:
+            await outbound.send(ctx.channel, f"✅ Successfully reset {reset_count} ongoing team creation process(es).")
         else:
-            await ctx.send("ℹ️ There was no active team creation process to reset.")
+            await outbound.send(ctx.channel, "ℹ️ There was no active team creation process to reset.")
     else:
-        await ctx.send("⚠️ You need administrator permissions to reset team creation processes.")
+        await outbound.send(ctx.channel, "⚠️ You need administrator permissions to reset team creation processes.")
+
+def is_team_admin(member) -> bool:
+    permissions = getattr(member, "guild_permissions", None)
+    return bool(permissions and (permissions.administrator or permissions.manage_guild))
+
+@client.command()
+async def shards(ctx):
+    """Shows latency and guild counts for every shard in the deployment."""
+    loop = asyncio.get_running_loop()
+    try:
+        rows, shard_count = await loop.run_in_executor(None, mongo.breaker.call, shard_status.read_all, db["shard_status"])
+    except Exception as e:
+        logger.warning(f"Could not read shard status, showing this process only: {e}")
+        rows, shard_count = shard_status.collect(client), client.shard_count
+    lines = []
+    for row in rows:
+        latency = f"{row['latency_ms']:.0f} ms" if row.get("latency_ms") is not None else "n/a"
+        state = "⚠️ stale" if row.get("stale") else ("✅" if row["connected"] else "❌ disconnected")
+        lines.append(f"`#{row['_id']}` {state} · {latency} · {row['guilds']} guild(s) · {row['host']}:{row['pid']}")
+    missing = sorted(set(range(shard_count or 0)) - {row["_id"] for row in rows})
+    if missing:
+        lines.append(f"❓ No reports yet from shard(s) {', '.join(map(str, missing))}")
+    embed = discord.Embed(
+        title=f"🧩 Shards ({shard_count or len(rows)})",
+        description="\n".join(lines) or "No shard reports yet.",
+        color=discord.Color.blue()
+    )
+    embed.set_footer(text=f"This server is on shard {ctx.guild.shard_id}" if ctx.guild else "Direct message")
+    await outbound.send(ctx.channel, embed=embed)
+
+@client.command()
+async def dbstats(ctx):
+    """Shows MongoDB latency, pool and circuit breaker metrics (admins only)."""
+    if not is_team_admin(ctx.author):
+        await outbound.send(ctx.channel, "⚠️ You need administrator permissions to view database metrics.")
+        return
+    stats = mongo.stats()
+    breaker = stats["breaker"]
+    pool_wait = stats["pool_wait"]
+    embed = discord.Embed(title="📊 Database Metrics", color=discord.Color.blue())
+    embed.add_field(name="Circuit breaker", value=(
+        f"{breaker['state']} · {breaker['consecutive_failures']} recent failure(s)\n"
+        f"{breaker['trips']} trip(s) · {breaker['rejected']} rejected call(s)"
+    ), inline=False)
+    embed.add_field(name="Connection pool", value=(
+        f"{stats['connections_in_use']}/{stats['connections_open']} connection(s) in use\n"
+        f"wait avg {pool_wait['avg_ms']:.1f} ms · max {pool_wait['max_ms']:.1f} ms · {stats['pool_timeouts']} timeout(s)"
+    ), inline=False)
+    commands_text = "\n".join(
+        f"`{name}` ×{op['count']}: avg {op['avg_ms']:.1f} ms, max {op['max_ms']:.1f} ms"
+        + (f", {op['failures']} failed" if op["failures"] else "")
+        for name, op in sorted(stats["commands"].items(), key=lambda item: -item[1]["count"])[:10]
+    )
+    embed.add_field(name="Commands", value=commands_text or "No commands yet", inline=False)
+    await outbound.send(ctx.channel, embed=embed)
+
+@client.command(name="import")
+async def import_command(ctx, mode: str = "unordered"):
+    """Bulk-imports teams from an attached CSV or JSON file (admins only)."""
+    if not is_team_admin(ctx.author):
+        await outbound.send(ctx.channel, "⚠️ You need administrator permissions to import teams.")
+        return
+    if not ctx.message.attachments:
+        await outbound.send(ctx.channel, "⚠️ Attach a .csv or .json file to `!import` (add `ordered` to stop at the first bad row).")
+        return
+    attachment = ctx.message.attachments[0]
+    if attachment.size > TEAM_IMPORT_MAX_BYTES:
+        await outbound.send(ctx.channel, f"⚠️ That file is too large; the limit is {TEAM_IMPORT_MAX_BYTES // 1024} KB.")
+        return
+    try:
+        fmt = detect_format(attachment.filename)
+        data = (await attachment.read()).decode("utf-8-sig")
+    except (ValueError, UnicodeDecodeError) as e:
+        await outbound.send(ctx.channel, f"⚠️ Could not read **{attachment.filename}**: {e}")
+        return
+
+    ordered = mode.lower() == "ordered"
+    await outbound.send(ctx.channel, f"📥 Importing **{attachment.filename}**...")
+    try:
+        loop = asyncio.get_running_loop()
+        report = await loop.run_in_executor(
+            None, mongo.breaker.call_unbounded, import_teams, db["teams"], db["memberships"], parse_rows(data, fmt), ordered
+        )
+    except Exception as e:
+        logger.error(f"Error importing {attachment.filename}: {e}")
+        await outbound.send(ctx.channel, db_error_message(e) if isinstance(e, DatabaseUnavailable) else f"❌ Import failed: {e}")
+        return
+    if report.team_keys and directory.ready:
+        await directory.reload()
+
+    embed = discord.Embed(
+        title="Import Finished" if not report.errors else "Import Finished With Errors",
+        description=f"Read {report.rows} row(s) from **{attachment.filename}**.",
+        color=discord.Color.green() if not report.errors else discord.Color.orange()
+    )
+    embed.add_field(name="Teams created", value=str(report.teams_created), inline=True)
+    embed.add_field(name="Teams updated", value=str(report.teams_updated), inline=True)
+    embed.add_field(name="Members added", value=str(report.memberships_created), inline=True)
+    error_file = None
+    if report.errors:
+        shown = "\n".join(f"Row {e.row} ({e.team_name or '?'}): {e.message}"[:200] for e in report.errors[:TEAM_IMPORT_ERRORS_SHOWN])
+        if len(report.errors) > TEAM_IMPORT_ERRORS_SHOWN:
+            shown += f"\n...and {len(report.errors) - TEAM_IMPORT_ERRORS_SHOWN} more (see attachment)"
+            lines = io.StringIO()
+            writer = csv.writer(lines)
+            writer.writerow(["row", "team_name", "error"])
+            writer.writerows((e.row, e.team_name or "", e.message) for e in report.errors)
+            error_file = discord.File(io.BytesIO(lines.getvalue().encode()), filename="import_errors.csv")
+        embed.add_field(name=f"Errors ({len(report.errors)})", value=shown[:1024], inline=False)
+    await outbound.send(ctx.channel, embed=embed, file=error_file)
+
+def _export_to_tempfile(fmt: str):
+    fp = tempfile.TemporaryFile()
+    text = io.TextIOWrapper(fp, encoding="utf-8", newline="")
+    count = export_teams(db["teams"], db["memberships"], text, fmt)
+    text.flush()
+    text.detach()
+    fp.seek(0)
+    return fp, count
+
+@client.command(name="export")
+async def export_command(ctx, fmt: str = "csv"):
+    """Exports every team as a CSV or JSON attachment (admins only)."""
+    if not is_team_admin(ctx.author):
+        await outbound.send(ctx.channel, "⚠️ You need administrator permissions to export teams.")
+        return
+    fmt = fmt.lower()
+    if fmt not in FORMATS:
+        await outbound.send(ctx.channel, f"⚠️ Unknown format **{fmt}**; use one of: {', '.join(FORMATS)}.")
+        return
+    try:
+        loop = asyncio.get_running_loop()
+        fp, count = await loop.run_in_executor(None, mongo.breaker.call_unbounded, _export_to_tempfile, fmt)
+    except Exception as e:
+        logger.error(f"Error exporting teams: {e}")
+        await outbound.send(ctx.channel, db_error_message(e) if isinstance(e, DatabaseUnavailable) else f"❌ Export failed: {e}")
+        return
+    with fp:
+        # wait=True: the temp file must stay open until the upload is done
+        await outbound.send(ctx.channel, f"📤 Exported {count} team(s).", file=discord.File(fp, filename=f"teams_{datetime.now():%Y%m%d}.{fmt}"), wait=True)
 
 @client.command()
 async def bothelp(ctx):
@@ -121,19 +382,24 @@ async def bothelp(ctx):
     • `Update <team>'s members to <member1, member2, ...>`.
     • `Show details for team <team>`.
     • `Remove <member> from team <team>`.
-    • `List all teams`.
+    • `List all teams` (or `List active backend teams`).
     • `Delete team <team>`.
     • `!exit`: To exit from current command.
     • `!bothelp`: Show this help message. """),
         inline=False
     )
-    embed.add_field(name="Technical Commands", value="• !ping - Check if bot is responsive", inline=False)
+    embed.add_field(name="Technical Commands", value=(
+        "• !ping - Check if bot is responsive\n"
+        "• !import [ordered] - Import teams from an attached CSV/JSON file (admins)\n"
+        "• !export [csv|json] - Download every team as a file (admins)\n"
+        "• !dbstats - Database latency, pool and circuit breaker metrics (admins)\n"
+        "• !shards - Latency and guild count for each shard"
+    ), inline=False)
     embed.set_footer(text="I use ML to understand your requests")
-    await ctx.send(embed=embed)
+    await outbound.send(ctx.channel, embed=embed)
 
 @client.event
 async def on_message(message):
-    global IS_COMMAND_RUNNING, TEAM_CREATION_USER, TEAM_CREATION_DATA, TEAM_CREATION_INDEX
 
     if message.author == client.user:
         return
@@ -142,12 +408,11 @@ async def on_message(message):
     if client.user.mentioned_in(message):
         text = re.sub(r'<@!?\d+>', '', message.content).strip()  # Clean the message
 
-        if text.lower() == "!exit" and IS_COMMAND_RUNNING:
-            IS_COMMAND_RUNNING = False
-            await message.channel.send("⌚❌ Exiting current operation - Execution Aborted!")
-            TEAM_CREATION_USER = None
-            TEAM_CREATION_DATA = {}
-            TEAM_CREATION_INDEX = 0
+        if text.lower() == "!exit" and await end_wizard(message):
+            await outbound.send(message.channel, "🚪 Team creation process has been cancelled.")
+            return
+        if text.lower() == "!exit" and cancel_running_commands(message):
+            await outbound.send(message.channel, "⌚❌ Exiting current operation - Execution Aborted!")
             return
 
         await client.process_commands(message)  # Still process commands (e.g., !ping)
@@ -155,44 +420,34 @@ async def on_message(message):
         if text.startswith(client.command_prefix):
             return
 
-        # Check for ongoing team creation process
-        if TEAM_CREATION_USER == message.author and TEAM_CREATION_INDEX < len(TEAM_CREATION_FIELDS):
-            field = TEAM_CREATION_FIELDS[TEAM_CREATION_INDEX]
-            TEAM_CREATION_DATA[field] = text  # Use the cleaned text
-            TEAM_CREATION_INDEX += 1
-
-            if TEAM_CREATION_INDEX < len(TEAM_CREATION_FIELDS):
-                await message.channel.send(f"Alright, next up: the **{TEAM_CREATION_FIELDS[TEAM_CREATION_INDEX].replace('_', ' ')}**? (or type 'skip' to leave empty)")
+        # Check for an ongoing team creation process by this user in this channel
+        key = session_key(message)
+        session = await wizard_sessions.resume(key)
+        if session is not None:
+            next_field = wizard_sessions.answer(session, text)  # Use the cleaned text
+            if next_field is not None:
+                await outbound.send(message.channel, f"Alright, next up: the **{next_field.replace('_', ' ')}**? (or type 'skip' to leave empty)")
             else:
-                await handle_create_team_interactive(message, TEAM_CREATION_DATA)
-                TEAM_CREATION_USER = None
-                TEAM_CREATION_DATA = {}
-                TEAM_CREATION_INDEX = 0
+                wizard_sessions.end(key)
+                await handle_create_team_interactive(message, session.data)
             return
 
         # Cache to avoid repeat processing (keep this)
-        cache_key = f"{message.channel.id}:{message.id}"
-        if not hasattr(client, 'processed_messages'):
-            client.processed_messages = set()
-        if cache_key in client.processed_messages:
+        if recent_messages.check_and_add(message.id):
             return
-        client.processed_messages.add(cache_key)
-        if len(client.processed_messages) > 100:
-            client.processed_messages = set(list(client.processed_messages)[-80:])
 
         # ML Prediction
         try:
-            prediction_result = predict(text)  # Use the cleaned text
-            intent = prediction_result.get("intent")
-            entities = prediction_result.get("entities", {})
-            confidence = prediction_result.get("confidence", "low")
+            # Runs off the event loop, on the inference server when one is configured
+            intent, entities = await (inference.predict(text) if inference is not None else predict_async(text))
+            confidence = "high" if intent and intent != "unknown" else "low"
             logger.info(f"Intent predicted: {intent}, Entities: {entities}, Confidence: {confidence}")
 
             if intent == "help" and confidence == "high":
                 await client.get_command('bothelp').invoke(await client.get_context(message))
                 return
             elif intent == "exit" and confidence == "high":
-                await message.channel.send("⌚❌ Exiting Command - Command Aborted!")
+                await outbound.send(message.channel, "⌚❌ Exiting Command - Command Aborted!")
                 return
             elif not intent or intent == "unknown" or confidence == "low":
                 # Provide a more helpful "unknown command" response
@@ -203,46 +458,56 @@ async def on_message(message):
                     "My apologies, but I couldn't process your request. Please see `!bothelp` for guidance.",
                     "Could you please clarify your command? I might have misunderstood. `!bothelp` lists what I can do."
                 ]
-                await message.channel.send(random.choice(responses))
+                await outbound.send(message.channel, random.choice(responses))
                 return
+        except InferenceQueueFull:
+            await outbound.send(message.channel, "⏳ I'm handling a lot of requests right now. Please try again in a moment.")
+            return
         except Exception as e:
-            await message.channel.send(f"❌ Prediction error: `{str(e)}`")
+            await outbound.send(message.channel, f"❌ Prediction error: `{str(e)}`")
             return
 
         logger.info(f"Handling intent: {intent} with entities: {entities}")
-        IS_COMMAND_RUNNING = True
-
         try:
-            # ... (your intent handling logic remains the same)
-            if intent == "assign_role":
-                await handle_assign_role(message, entities)
-            elif intent == "update_team_repo":
-                await handle_update_team_repo(message, entities)
-            elif intent == "update_team_members":
-                await handle_update_team_members(message, entities)
-            elif intent == "update_team_status":
-                await handle_update_team_status(message, entities)
-            elif intent == "update_team_role":
-                await handle_update_team_role(message, entities)
-            elif intent == "show_team_info":
-                await handle_show_team_info(message, entities)
-            elif intent == "remove_member":
-                await handle_remove_member(message, entities)
-            elif intent == "list_teams":
-                await handle_list_teams(message)
-            elif intent == "create_team":
-                logger.info("Calling start_create_team function.")
-                await start_create_team(message)
-            elif intent == "delete_team":
-                await handle_delete_team(message, entities)
-            elif intent == "greeting" and confidence == "high":
-                greetings = [f"👋 Hello {message.author.display_name}!", f"Hey there, {message.author.display_name}!", f"Greetings, {message.author.display_name}!"]
-                await message.channel.send(random.choice(greetings))
-        finally:
-            IS_COMMAND_RUNNING = False
+            completed = await command_scheduler.run(
+                message.guild.id if message.guild else 0,
+                (message.channel.id, message.author.id),
+                lambda: dispatch_intent(message, intent, entities, confidence)
+            )
+            if not completed:
+                logger.info(f"Intent {intent} was cancelled by the user")
+        except SchedulerBusy:
+            await outbound.send(message.channel, "⏳ This server has a lot of commands waiting. Please try again in a moment.")
     else:
         await client.process_commands(message) # Allow regular commands (!ping, !help) to work even without a mention
 
+async def dispatch_intent(message, intent, entities, confidence):
+    """Run the handler for a predicted intent."""
+    if intent == "assign_role":
+        await handle_assign_role(message, entities)
+    elif intent == "update_team_repo":
+        await handle_update_team_repo(message, entities)
+    elif intent == "update_team_members":
+        await handle_update_team_members(message, entities)
+    elif intent == "update_team_status":
+        await handle_update_team_status(message, entities)
+    elif intent == "update_team_role":
+        await handle_update_team_role(message, entities)
+    elif intent == "show_team_info":
+        await handle_show_team_info(message, entities)
+    elif intent == "remove_member":
+        await handle_remove_member(message, entities)
+    elif intent == "list_teams":
+        await handle_list_teams(message, entities)
+    elif intent == "create_team":
+        logger.info("Calling start_create_team function.")
+        await start_create_team(message)
+    elif intent == "delete_team":
+        await handle_delete_team(message, entities)
+    elif intent == "greeting" and confidence == "high":
+        greetings = [f"👋 Hello {message.author.display_name}!", f"Hey there, {message.author.display_name}!", f"Greetings, {message.author.display_name}!"]
+        await outbound.send(message.channel, random.choice(greetings))
+
 async def handle_assign_role(message, entities):
     """Handle role assignment intent."""
     name = entities.get("member_name") or entities.get("name")
@@ -250,36 +515,21 @@ async def handle_assign_role(message, entities):
     team = entities.get("team_name") or entities.get("team")
 
     if not name:
-        await message.channel.send("⚠️ Who are you trying to assign a role to?")
+        await outbound.send(message.channel, "⚠️ Who are you trying to assign a role to?")
         return
     if not team:
-        await message.channel.send("⚠️ Which team are you referring to?")
+        await outbound.send(message.channel, "⚠️ Which team are you referring to?")
         return
 
-    data = {
-        "name": name,
-        "role": role,
-        "team": team,
-        "updated_at": datetime.now()
-    }
-
     try:
-        existing_member = collection.find_one({"name": name, "team": team})
+        existing_member = await teams.assign_role(name, role, team)
 
+        if existing_member is None:
+            await outbound.send(message.channel, f"⚠️ Team **{team}** not found.")
+            return
         if existing_member:
-            collection.update_one(
-                {"name": name, "team": team},
-                {"$set": data}
-            )
             response = f"Updated **{name}'s** role to **{role}** in **{team}**." if role else f"Removed the role for **{name}** in **{team}**."
         else:
-            team_doc = collection.find_one({"team_name": team})
-            if team_doc:
-                collection.update_one(
-                    {"team_name": team},
-                    {"$addToSet": {"members": name}}
-                )
-            collection.insert_one(data)
             response = f"Assigned **{role}** to **{name}** in **{team}**." if role else f"Added **{name}** to **{team}**."
 
         fields = [
@@ -292,10 +542,10 @@ async def handle_assign_role(message, entities):
             response,
             fields
         )
-        await message.channel.send(embed=embed)
+        await outbound.send(message.channel, embed=embed)
     except Exception as e:
         logger.error(f"Error in handle_assign_role: {e}")
-        await message.channel.send(f"❌ Database error: {e}")
+        await outbound.send(message.channel, db_error_message(e))
 
 from datetime import datetime
 import re
@@ -306,25 +556,16 @@ async def handle_update_team_repo(message, entities):
     repo = (entities.get("repo") or "").strip()
 
     if not team_name:
-        await message.channel.send("⚠️ Please specify the team name to update the repository for.")
+        await outbound.send(message.channel, "⚠️ Please specify the team name to update the repository for.")
         return
     if not repo:
-        await message.channel.send("⚠️ Please provide the new repository URL.")
+        await outbound.send(message.channel, "⚠️ Please provide the new repository URL.")
         return
 
     try:
-        # Case-insensitive search
-        result = collection.update_one(
-            {
-                "$or": [
-                    {"team_name": re.compile(f"^{re.escape(team_name)}$", re.IGNORECASE)},
-                    {"team": re.compile(f"^{re.escape(team_name)}$", re.IGNORECASE)}
-                ]
-            },
-            {"$set": {"repo": repo, "updated_at": datetime.utcnow()}}
-        )
+        modified_count = await teams.update_team_fields(team_name, {"repo": repo})
 
-        if result.modified_count > 0:
+        if modified_count > 0:
             fields = [
                 ("Team", team_name, True),
                 ("Repository", repo, False)
@@ -334,33 +575,32 @@ async def handle_update_team_repo(message, entities):
                 f"The repository URL for **{team_name}** has been updated.",
                 fields
             )
-            await message.channel.send(embed=embed)
+            await outbound.send(message.channel, embed=embed)
         else:
-            await message.channel.send(f"⚠️ No matching team found with the name **{team_name}**.")
+            await outbound.send(message.channel, f"⚠️ No matching team found with the name **{team_name}**.")
     except Exception as e:
         logger.error(f"Error in handle_update_team_repo: {e}")
-        await message.channel.send(f"❌ Database error: {e}")
+        await outbound.send(message.channel, db_error_message(e))
 
 async def handle_update_team_members(message, entities):
     """Handle updating team members directly."""
     team_name = entities.get("team_name") or entities.get("team")
-    members_str = entities.get("members")
+    members = entities.get("members") # extract_members returns a list; other callers may pass "a, b"
 
     if not team_name:
-        await message.channel.send("⚠️ Please specify the team to update members for.")
+        await outbound.send(message.channel, "⚠️ Please specify the team to update members for.")
         return
-    if not members_str:
-        await message.channel.send("⚠️ Please provide the new list of members.")
+    if not members:
+        await outbound.send(message.channel, "⚠️ Please provide the new list of members.")
         return
 
-    members_list = [m.strip() for m in members_str.split(",")]
+    if isinstance(members, str):
+        members = members.split(",")
+    members_list = [m.strip() for m in members if m.strip()]
 
     try:
-        result = collection.update_one(
-            {"$or": [{"team_name": team_name}, {"team": team_name}]},
-            {"$set": {"members": members_list, "updated_at": datetime.utcnow()}}
-        )
-        if result.modified_count > 0:
+        matched_count = await teams.set_members(team_name, members_list)
+        if matched_count > 0:
             fields = [
                 ("Team", team_name, True),
                 ("Members", "\n• " + "\n• ".join(members_list), False)
@@ -370,12 +610,12 @@ async def handle_update_team_members(message, entities):
                 f"The members for **{team_name}** have been updated.",
                 fields
             )
-            await message.channel.send(embed=embed)
+            await outbound.send(message.channel, embed=embed)
         else:
-            await message.channel.send(f"⚠️ Could not find team **{team_name}**.")
+            await outbound.send(message.channel, f"⚠️ Could not find team **{team_name}**.")
     except Exception as e:
         logger.error(f"Error in handle_update_team_members: {e}")
-        await message.channel.send(f"❌ Database error: {e}")
+        await outbound.send(message.channel, db_error_message(e))
 
 from datetime import datetime
 import re
@@ -386,37 +626,28 @@ async def handle_update_team_status(message, entities):
     status = (entities.get("status") or "").strip()
 
     if not team_name:
-        await message.channel.send("⚠️ Which team's status do you want to update?")
+        await outbound.send(message.channel, "⚠️ Which team's status do you want to update?")
         return
     if not status:
-        await message.channel.send("⚠️ What is the new status?")
+        await outbound.send(message.channel, "⚠️ What is the new status?")
         return
 
     try:
-        # Case-insensitive search using regex
-        result = collection.update_one(
-            {
-                "$or": [
-                    {"team_name": re.compile(f"^{re.escape(team_name)}$", re.IGNORECASE)},
-                    {"team": re.compile(f"^{re.escape(team_name)}$", re.IGNORECASE)}
-                ]
-            },
-            {"$set": {"status": status, "updated_at": datetime.utcnow()}}
-        )
+        modified_count = await teams.update_team_fields(team_name, {"status": status})
 
-        if result.modified_count > 0:
+        if modified_count > 0:
             fields = [("Team", team_name, True), ("Status", status, True)]
             embed = await create_success_embed(
                 "✅ Team Status Updated",
                 f"The status for **{team_name}** has been updated to **{status}**.",
                 fields
             )
-            await message.channel.send(embed=embed)
+            await outbound.send(message.channel, embed=embed)
         else:
-            await message.channel.send(f"⚠️ No matching team found with the name **{team_name}**.")
+            await outbound.send(message.channel, f"⚠️ No matching team found with the name **{team_name}**.")
     except Exception as e:
         logger.error(f"Error in handle_update_team_status: {e}")
-        await message.channel.send(f"❌ Database error: {e}")
+        await outbound.send(message.channel, db_error_message(e))
 
 async def handle_update_team_role(message, entities):
     """Handle updating the overall team role (if your data model supports it)."""
@@ -424,18 +655,15 @@ async def handle_update_team_role(message, entities):
     role = entities.get("role")  # Assuming your NLP can differentiate this from member role
 
     if not team_name:
-        await message.channel.send("⚠️ Which team's role do you want to update?")
+        await outbound.send(message.channel, "⚠️ Which team's role do you want to update?")
         return
     if not role:
-        await message.channel.send("⚠️ What is the new role for the team?")
+        await outbound.send(message.channel, "⚠️ What is the new role for the team?")
         return
 
     try:
-        result = collection.update_one(
-            {"$or": [{"team_name": team_name}, {"team": team_name}]},
-            {"$set": {"role": role, "updated_at": datetime.utcnow()}}
-        )
-        if result.modified_count > 0:
+        modified_count = await teams.update_team_fields(team_name, {"role": role})
+        if modified_count > 0:
             fields = [
                 ("Team", team_name, True),
                 ("Role", role, True)
@@ -445,12 +673,12 @@ async def handle_update_team_role(message, entities):
                 f"The role for **{team_name}** has been updated to **{role}**.",
                 fields
             )
-            await message.channel.send(embed=embed)
+            await outbound.send(message.channel, embed=embed)
         else:
-            await message.channel.send(f"⚠️ Could not find team **{team_name}**.")
+            await outbound.send(message.channel, f"⚠️ Could not find team **{team_name}**.")
     except Exception as e:
         logger.error(f"Error in handle_update_team_role: {e}")
-        await message.channel.send(f"❌ Database error: {e}")
+        await outbound.send(message.channel, db_error_message(e))
 
 async def handle_show_team_info(message, entities):
     """Handle showing details for a specific team."""
@@ -467,16 +695,11 @@ async def handle_show_team_info(message, entities):
     team_name = entities.get("team_name") or entities.get("team")
 
     if not team_name:
-        await message.channel.send("⚠️ Please specify the team name you want to see details for.")
+        await outbound.send(message.channel, "⚠️ Please specify the team name you want to see details for.")
         return
 
     try:
-        doc = collection.find_one({
-            "$or": [
-                {"team_name": {"$regex": f"^{re.escape(team_name)}$", "$options": "i"}},
-                {"team": {"$regex": f"^{re.escape(team_name)}$", "$options": "i"}}
-            ]
-        })
+        doc = directory.get(team_name) if directory.ready else await teams.find_team(team_name)
 
         if doc:
             members_list = doc.get("members", [])
@@ -494,12 +717,12 @@ async def handle_show_team_info(message, entities):
                 embed.add_field(name="Repository", value=doc["repo"], inline=False)
             embed.add_field(name="Members", value=members_str, inline=False)
             embed.set_footer(text="Team details fetched from the database")
-            await message.channel.send(embed=embed)
+            await outbound.send(message.channel, embed=embed)
         else:
-            await message.channel.send(f"⚠️ Team **{team_name}** not found in the database.")
+            await outbound.send(message.channel, f"⚠️ Team **{team_name}** not found in the database.")
     except Exception as e:
         logger.error(f"Error in handle_show_team_info: {e}")
-        await message.channel.send(f"❌ Database error: {e}")
+        await outbound.send(message.channel, db_error_message(e))
 
 async def handle_remove_member(message, entities):
     """Handle removing a member from a team."""
@@ -526,97 +749,137 @@ async def handle_remove_member(message, entities):
     name = entities.get("member_name") or entities.get("name")
 
     if not name:
-        await message.channel.send("⚠️ Please specify the member you want to remove.")
+        await outbound.send(message.channel, "⚠️ Please specify the member you want to remove.")
         return
     if not team_name:
-        await message.channel.send("⚠️ Please specify the team to remove the member from.")
+        await outbound.send(message.channel, "⚠️ Please specify the team to remove the member from.")
         return
 
     try:
-        team_doc = collection.find_one({
-            "$or": [
-                {"team_name": {"$regex": f"^{re.escape(team_name)}$", "$options": "i"}},
-                {"team": {"$regex": f"^{re.escape(team_name)}$", "$options": "i"}}
-            ]
-        })
-
-        if not team_doc:
-            await message.channel.send(f"⚠️ Team **{team_name}** not found.")
-            return
+        removed = await teams.remove_member(team_name, name)
 
-        if name not in team_doc.get("members", []):
-            await message.channel.send(f"⚠️ **{name}** is not a member of **{team_doc.get('team_name', team_name)}**.")
-            return
-
-        result = collection.update_one(
-            {"_id": team_doc["_id"]},
-            {"$pull": {"members": name}, "$set": {"updated_at": datetime.utcnow()}}
-        )
-
-        if result.modified_count > 0:
+        if removed:
             fields = [
-                ("Member", name, True),
-                ("Team", team_doc.get("team_name", team_name), True)
+                ("Member", removed["name"], True),
+                ("Team", removed["team"], True)
             ]
             embed = await create_success_embed(
                 "Member Removed",
-                f"**{name}** has been removed from **{team_doc.get('team_name', team_name)}**.",
+                f"**{removed['name']}** has been removed from **{removed['team']}**.",
                 fields
             )
-            await message.channel.send(embed=embed)
+            await outbound.send(message.channel, embed=embed)
+        elif not await teams.team_exists(team_name):
+            await outbound.send(message.channel, f"⚠️ Team **{team_name}** not found.")
         else:
-            await message.channel.send("⚠️ Could not remove the member. Please try again.")
+            await outbound.send(message.channel, f"⚠️ **{name}** is not a member of **{team_name}**.")
     except Exception as e:
         logger.error(f"Error in handle_remove_member: {e}")
-        await message.channel.send(f"❌ Database error: {e}")
+        await outbound.send(message.channel, db_error_message(e))
+
+class TeamListView(discord.ui.View):
+    """Previous/Next buttons over a team listing, paged with a team_key range cursor."""
+
+    def __init__(self, status=None, role=None):
+        super().__init__(timeout=180)
+        self.status = status
+        self.role = role
+        self.page_number = 1
+        self.docs = []
+        self.message = None
+
+    async def load(self, after=None, before=None) -> bool:
+        """Fetch the page after/before a cursor; returns False if it is empty."""
+        docs, has_more = await teams.list_teams_page(after=after, before=before, status=self.status, role=self.role)
+        if not docs:
+            return False
+        self.docs = docs
+        if before is not None:
+            self.previous_page.disabled = not has_more
+            self.next_page.disabled = False
+        else:
+            self.previous_page.disabled = after is None
+            self.next_page.disabled = not has_more
+        return True
+
+    def embed(self) -> discord.Embed:
+        lines = []
+        for doc in self.docs:
+            details = " · ".join(str(doc[k]) for k in ("status", "role") if doc.get(k))
+            lines.append(f"• {doc['team_name']}" + (f" — {details}" if details else ""))
+        filters = ", ".join(f"{k}: {v}" for k, v in (("status", self.status), ("role", self.role)) if v)
+        embed = discord.Embed(
+            title="All Teams" + (f" ({filters})" if filters else ""),
+            description="\n".join(lines),
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text=f"Page {self.page_number}")
+        return embed
 
-async def handle_list_teams(message):
-    """Handle listing all teams in the database."""
+    async def _turn(self, interaction: discord.Interaction, step: int):
+        if step > 0:
+            found = await self.load(after=self.docs[-1]["team_key"])
+        else:
+            found = await self.load(before=self.docs[0]["team_key"])
+        if not found:
+            await interaction.response.send_message("ℹ️ There are no more teams in that direction.", ephemeral=True)
+            return
+        self.page_number = self.page_number + step if not self.previous_page.disabled else 1
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, -1)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, 1)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+async def handle_list_teams(message, entities):
+    """Handle listing teams one page at a time, optionally filtered by status and role."""
+    view = TeamListView(status=entities.get("status"), role=entities.get("role"))
     try:
-        teams = list(collection.distinct("team_name")) + list(collection.distinct("team"))
-        teams = [t for t in teams if t]  # Filter out None values
-        unique_teams = sorted(list(set(teams)))
-
-        if unique_teams:
-            embed = discord.Embed(
-                title="All Teams",
-                description="\n• " + "\n• ".join(unique_teams),
-                color=discord.Color.blue()
-            )
-            await message.channel.send(embed=embed)
+        if await view.load():
+            view.message = await outbound.send(message.channel, embed=view.embed(), view=view, wait=True)
+        elif view.status or view.role:
+            await outbound.send(message.channel, "There are no teams matching those filters.")
         else:
-            await message.channel.send("There are currently no teams in the database.")
+            await outbound.send(message.channel, "There are currently no teams in the database.")
     except Exception as e:
         logger.error(f"Error in handle_list_teams: {e}")
-        await message.channel.send(f"❌ Database error: {e}")
+        await outbound.send(message.channel, db_error_message(e))
 
 async def handle_delete_team(message, entities):
     """Handle deleting a team from the database."""
     team_name = entities.get("team_name") or entities.get("team")
 
     if not team_name:
-        await message.channel.send("⚠️ Please specify the name of the team you wish to delete.")
+        await outbound.send(message.channel, "⚠️ Please specify the name of the team you wish to delete.")
         return
 
     try:
-        delete_result = collection.delete_one({
-            "$or": [
-                {"team_name": {"$regex": f"^{re.escape(team_name)}$", "$options": "i"}},
-                {"team": {"$regex": f"^{re.escape(team_name)}$", "$options": "i"}}
-            ]
-        })
+        deleted_count = await teams.delete_team(team_name)
 
-        if delete_result.deleted_count > 0:
+        if deleted_count > 0:
             embed = await create_success_embed(
                 "Team Deleted",
                 f"Team **{team_name}** has been successfully removed."
             )
-            await message.channel.send(embed=embed)
+            await outbound.send(message.channel, embed=embed)
         else:
-            await message.channel.send(f"⚠️ No team found with the name **{team_name}** to delete.")
+            await outbound.send(message.channel, f"⚠️ No team found with the name **{team_name}** to delete.")
     except Exception as e:
         logger.error(f"Error deleting team {team_name}: {e}")
-        await message.channel.send(f"❌ Database error while deleting the team: {e}")
+        await outbound.send(message.channel, db_error_message(e))
 
 async def create_success_embed(title: str, description: str, fields: list = []) -> discord.Embed:
     """Creates a standard success embed."""
@@ -627,18 +890,25 @@ async def create_success_embed(title: str, description: str, fields: list = [])
 
 async def start_create_team(message: discord.Message):
     """Starts the interactive team creation process."""
-    global TEAM_CREATION_USER, TEAM_CREATION_DATA, TEAM_CREATION_INDEX
-    if TEAM_CREATION_USER is not None:
-        await message.channel.send("⏳ A team creation process is already underway. Please finish that first or type `!exit` to cancel.")
+    key = session_key(message)
+    if await wizard_sessions.resume(key) is not None:
+        await outbound.send(message.channel, "⏳ You already have a team creation underway here. Please finish that first or type `!exit` to cancel.")
         return
-    TEAM_CREATION_USER = message.author
-    TEAM_CREATION_DATA = {}
-    TEAM_CREATION_INDEX = 0
-    await message.channel.send(f"Alright, let's get a new team set up! First, what will be the **{TEAM_CREATION_FIELDS[0].replace('_', ' ')}**?")
+    if await restart_team_creation(message):
+        await outbound.send(message.channel, TEAM_CREATION_FIRST_PROMPT)
+
+async def restart_team_creation(message: discord.Message) -> bool:
+    """Opens a fresh wizard session for the author; False if the session limits are reached."""
+    try:
+        wizard_sessions.start(session_key(message))
+        return True
+    except SessionLimitReached as e:
+        logger.warning(f"Team creation refused: {e}")
+        await outbound.send(message.channel, "⏳ Too many teams are being created right now. Please try again in a few minutes.")
+        return False
 
 async def handle_create_team_interactive(message: discord.Message, team_data: dict):
     """Handles the interactive creation of a new team."""
-    global TEAM_CREATION_USER, TEAM_CREATION_DATA, TEAM_CREATION_INDEX
     team_name = team_data.get("team_name")
     role = team_data.get("role")
     members_str = team_data.get("members")
@@ -646,19 +916,9 @@ async def handle_create_team_interactive(message: discord.Message, team_data: di
     status = team_data.get("status")
 
     if not team_name:
-        await message.channel.send("A team needs a name! Let's try again from the beginning.")
-        TEAM_CREATION_USER = message.author
-        TEAM_CREATION_DATA = {}
-        TEAM_CREATION_INDEX = 0
-        await message.channel.send(f"Alright, let's get a new team set up! First, what will be the **{TEAM_CREATION_FIELDS[0].replace('_', ' ')}**?")
-        return
-
-    if collection.find_one({"team_name": team_name}):
-        await message.channel.send(f"A team with the name **{team_name}** already exists. Please choose a different name.")
-        TEAM_CREATION_USER = message.author
-        TEAM_CREATION_DATA = {}
-        TEAM_CREATION_INDEX = 0
-        await message.channel.send(f"Alright, let's get a new team set up! First, what will be the **{TEAM_CREATION_FIELDS[0].replace('_', ' ')}**?")
+        await outbound.send(message.channel, "A team needs a name! Let's try again from the beginning.")
+        if await restart_team_creation(message):
+            await outbound.send(message.channel, TEAM_CREATION_FIRST_PROMPT)
         return
 
     members = [member.strip() for member in members_str.split(',')] if members_str and members_str.lower() != "skip" else []
@@ -673,7 +933,12 @@ async def handle_create_team_interactive(message: discord.Message, team_data: di
     }
 
     try:
-        collection.insert_one(team_info)
+        if not await teams.create_team(team_info):
+            # The insert hit the unique team_key index
+            await outbound.send(message.channel, f"A team with the name **{team_name}** already exists. Please choose a different name.")
+            if await restart_team_creation(message):
+                await outbound.send(message.channel, TEAM_CREATION_FIRST_PROMPT)
+            return
 
         fields = [
                 ("Role", team_info["role"] if team_info["role"] else "N/A", True),
@@ -687,24 +952,18 @@ async def handle_create_team_interactive(message: discord.Message, team_data: di
                 f"The team **{team_name}** has been successfully created!",
                 fields
             )
-        await message.channel.send(embed=embed) # <---- THIS IS WHERE THE MESSAGE IS SENT
+        await outbound.send(message.channel, embed=embed) # <---- THIS IS WHERE THE MESSAGE IS SENT
     except Exception as e:
         logger.error(f"Error creating team {team_name}: {e}")
-        await message.channel.send(f"❌ Oops! There was an issue creating the team: {e}")
-    finally:
-        TEAM_CREATION_USER = None
-        TEAM_CREATION_DATA = {}
-        TEAM_CREATION_INDEX = 0
+        await outbound.send(message.channel, f"❌ Oops! There was an issue creating the team: {e}")
 
 async def handle_exit_command(message: discord.Message):
     """Handles cancellation of the team creation process."""
-    global TEAM_CREATION_USER, TEAM_CREATION_DATA, TEAM_CREATION_INDEX
-    if TEAM_CREATION_USER == message.author:
-        TEAM_CREATION_USER = None
-        TEAM_CREATION_DATA = {}
-        TEAM_CREATION_INDEX = 0
-        await message.channel.send("🚪 Team creation process has been cancelled.")
+    if await end_wizard(message):
+        await outbound.send(message.channel, "🚪 Team creation process has been cancelled.")
     else:
-        await message.channel.send("❌ You are not the one currently creating a team.")
+        await outbound.send(message.channel, "❌ You have no team creation in progress in this channel.")
 
+if inference is None:
+    start_model_loading()  # Warm the models in the background while connecting
 client.run(os.getenv('DISCORD_BOT_TOKEN'))
\ No newline at end of file
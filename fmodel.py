@@ -1,19 +1,20 @@
-from transformers import pipeline
+import numpy as np
 import re
 import logging
 import time
 import string
-from typing import Dict, List, Any, Tuple, Optional
-import nltk
-
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
+import os
+import asyncio
+import threading
+import json
+import hashlib
+import inspect
+import sqlite3
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Any, Tuple, Optional, NamedTuple
+from intent_model import HashedNgramIntentModel
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +26,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger("fmodel")
 
+# Labelled traffic (one JSON object per line) for retraining intent_model.py
+INTENT_TRAFFIC_LOG = os.getenv("INTENT_TRAFFIC_LOG", "")
+traffic_logger = logging.getLogger("fmodel.traffic")
+traffic_logger.propagate = False
+if INTENT_TRAFFIC_LOG:
+    traffic_logger.addHandler(logging.FileHandler(INTENT_TRAFFIC_LOG, encoding="utf-8"))
+    traffic_logger.setLevel(logging.INFO)
+
 INTENTS_LIST = [
     "assign_role",
     "update_team_repo",
@@ -106,29 +115,269 @@ STATUS_KEYWORDS = [
     "paused", "delayed", "blocked", "complete"
 ]
 
-# Load models with error handling
-try:
-    classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-    ner = pipeline("ner", grouped_entities=True)
-    logger.info("ML models loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading ML models: {e}")
+# Inference executor settings ("thread" or "process" pool)
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+# Threads share one model and feed its micro-batches; each process loads its own BART and NER, so keep that pool small
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS") or ("2" if INFERENCE_EXECUTOR == "process" else "8"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))
+
+# Micro-batching settings for zero-shot and NER passes
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+
+HYPOTHESIS_TEMPLATE = "The user wants to {}."
+
+# Inference backend: "torch", "onnx" or "onnx-int8" (see onnx_backend.py)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch")
+ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
+NER_MODEL = "dbmdz/bert-large-cased-finetuned-conll03-english"
+
+# Sentence-embedding tier, tried before the zero-shot fallback
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_THRESHOLD = float(os.getenv("EMBEDDING_THRESHOLD", "0.6"))
+EMBEDDING_TOP_K = int(os.getenv("EMBEDDING_TOP_K", "3"))
+
+# Trained hashed n-gram tier (intent_model.py); escalate below the threshold
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "intent_model.npz")
+INTENT_MODEL_THRESHOLD = float(os.getenv("INTENT_MODEL_THRESHOLD", "0.7"))
+
+# Prediction cache: in-memory LRU, plus an optional SQLite file that survives restarts
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+PREDICTION_CACHE_DB = os.getenv("PREDICTION_CACHE_DB", "")
+
+def dummy_classifier(text, candidate_labels, hypothesis_template=None):
+    result = {"labels": INTENTS_LIST, "scores": [0.1] * len(INTENTS_LIST)}
+    return [dict(result) for _ in text] if isinstance(text, list) else result
+
+def dummy_ner(text):
+    return [[] for _ in text] if isinstance(text, list) else []
+
+# Models are loaded lazily by load_models(); until then only the regex tier runs
+classifier = None
+ner = None
+MODEL_STATE = "cold" # cold -> loading -> ready | degraded
+MODEL_LOAD_TIMINGS: Dict[str, float] = {}
+_models_loaded = threading.Event() # models usable by predict() in this process
+_pool_ready = threading.Event() # process pool workers have finished loading
+_loader_lock = threading.Lock()
+_loader_thread: Optional[threading.Thread] = None
+
+class EmbeddingIntentClassifier:
+    """Classify intents by cosine similarity to the INTENT_DESCRIPTIONS paraphrases."""
+
+    def __init__(self, encoder, descriptions: Dict[str, List[str]]):
+        self.encoder = encoder
+        self.labels = [intent for intent, phrases in descriptions.items() for _ in phrases]
+        phrases = [phrase for examples in descriptions.values() for phrase in examples]
+        self.matrix = self.encode(phrases) # (n_phrases, dim), rows L2-normalised
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Mean-pool token features into unit-length sentence vectors."""
+        features = self.encoder(texts)
+        vectors = np.stack([np.asarray(f[0], dtype=np.float32).mean(axis=0) for f in features])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.clip(norms, 1e-12, None)
+
+    def top_k(self, text: str, k: int = EMBEDDING_TOP_K) -> List[Tuple[str, float]]:
+        """Return the k most similar description labels with their cosine scores."""
+        scores = self.matrix @ self.encode([text])[0]
+        k = min(k, len(scores))
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx])]
+        return [(self.labels[i], float(scores[i])) for i in idx]
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Vote over the top-k neighbours; confidence is the winner's best similarity."""
+        neighbours = self.top_k(text)
+        votes: Dict[str, float] = {}
+        for label, score in neighbours:
+            votes[label] = votes.get(label, 0.0) + score
+        intent = max(votes, key=votes.get)
+        return intent, max(score for label, score in neighbours if label == intent)
+
+embedding_classifier: Optional[EmbeddingIntentClassifier] = None
+
+@contextmanager
+def _timed_phase(name: str):
+    start_time = time.perf_counter()
     try:
-        classifier = pipeline("zero-shot-classification")
-        ner = pipeline("ner")
-        logger.warning("Using fallback ML models")
-    except Exception as e:
-        logger.critical(f"Critical error loading fallback models: {e}")
+        yield
+    finally:
+        MODEL_LOAD_TIMINGS[name] = time.perf_counter() - start_time
+        logger.info(f"Model loading phase '{name}' took {MODEL_LOAD_TIMINGS[name]:.2f} seconds")
+
+def load_models() -> None:
+    """Load the ML models into this process (blocking, idempotent)."""
+    global classifier, ner, embedding_classifier, prediction_cache, MODEL_STATE
+    with _loader_lock:
+        if _models_loaded.is_set():
+            return
+        MODEL_STATE = "loading"
+        state = "ready"
+        try:
+            with _timed_phase("import"):
+                from transformers import pipeline
+            try:
+                if MODEL_BACKEND == "torch":
+                    with _timed_phase("zero-shot"):
+                        classifier = pipeline("zero-shot-classification", model=ZERO_SHOT_MODEL)
+                    with _timed_phase("ner"):
+                        ner = pipeline("ner", model=NER_MODEL, grouped_entities=True)
+                else:
+                    from onnx_backend import load_onnx_pipelines
+                    with _timed_phase(MODEL_BACKEND):
+                        classifier, ner = load_onnx_pipelines(quantize=MODEL_BACKEND == "onnx-int8")
+                logger.info(f"ML models loaded successfully ({MODEL_BACKEND} backend)")
+            except Exception as e:
+                logger.error(f"Error loading ML models: {e}")
+                with _timed_phase("fallback"):
+                    classifier = pipeline("zero-shot-classification")
+                    ner = pipeline("ner")
+                logger.warning("Using fallback ML models")
+        except Exception as e:
+            logger.critical(f"Critical error loading fallback models: {e}")
+            classifier = dummy_classifier
+            ner = dummy_ner
+            state = "degraded"
+            logger.critical("Using dummy ML functions")
+        else:
+            try:
+                with _timed_phase("embedding"):
+                    embedding_classifier = EmbeddingIntentClassifier(
+                        pipeline("feature-extraction", model=EMBEDDING_MODEL), INTENT_DESCRIPTIONS
+                    )
+                logger.info(f"Embedding intent tier ready with {len(embedding_classifier.labels)} descriptions")
+            except Exception as e:
+                logger.warning(f"Embedding intent tier disabled: {e}")
+                embedding_classifier = None
+        prediction_cache = PredictionCache(prediction_cache_version(), db_path=PREDICTION_CACHE_DB)
+        MODEL_STATE = state
+        _models_loaded.set()
+
+def _warm_process_pool() -> None:
+    # Each worker runs load_models() as its initializer before taking tasks
+    global MODEL_STATE
+    executor = get_inference_executor()
+    workers: Dict[int, str] = {}
+    with _timed_phase("process-pool"):
+        # map() doesn't promise every worker takes a task, so keep probing until each one has reported
+        while len(workers) < INFERENCE_WORKERS:
+            for pid, loaded, state in executor.map(_worker_models_loaded, range(INFERENCE_WORKERS)):
+                if loaded:
+                    workers[pid] = state
+    MODEL_STATE = "degraded" if "degraded" in workers.values() else "ready"
+    logger.info(f"Process pool ready: {len(workers)} worker(s), state {MODEL_STATE}")
+    _pool_ready.set()
+
+def _worker_models_loaded(_: int) -> Tuple[int, bool, str]:
+    time.sleep(0.05) # hold this worker briefly so the other probes reach other workers
+    return os.getpid(), _models_loaded.is_set(), MODEL_STATE
+
+def start_model_loading() -> threading.Thread:
+    """Load the models on a background thread; predictions use the regex tier until they are ready."""
+    global _loader_thread, MODEL_STATE
+    if _loader_thread is None:
+        target = _warm_process_pool if INFERENCE_EXECUTOR == "process" else load_models
+        if INFERENCE_EXECUTOR == "process":
+            MODEL_STATE = "loading"
+        _loader_thread = threading.Thread(target=target, name="fmodel-loader", daemon=True)
+        _loader_thread.start()
+    return _loader_thread
+
+def models_ready() -> bool:
+    """True once predictions go through the ML models instead of the regex tier only."""
+    return (_pool_ready if INFERENCE_EXECUTOR == "process" else _models_loaded).is_set()
+
+def get_model_status() -> Dict[str, Any]:
+    """Return the loading state and per-phase load times in seconds."""
+    return {"state": MODEL_STATE, "ready": models_ready(), "timings": dict(MODEL_LOAD_TIMINGS)}
+
+class MicroBatcher:
+    """Collect concurrent single-item calls for a short window and run them as one batch."""
+
+    def __init__(self, name: str, batch_fn, max_batch_size: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: List[Tuple[Any, Future]] = []
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self.batches = 0
+        self.items = 0
 
-        def dummy_classifier(text, candidate_labels, hypothesis_template=None):
-            return {"labels": INTENTS_LIST, "scores": [0.1] * len(INTENTS_LIST)}
+    def submit(self, item: Any) -> Any:
+        """Queue one item and block until its batch has been processed."""
+        if self.max_batch_size == 1:
+            return self.batch_fn([item])[0]
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((item, future))
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                self._worker.start()
+            self._cond.notify()
+        return future.result()
 
-        def dummy_ner(text):
-            return []
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+            self._execute(batch)
 
-        classifier = dummy_classifier
-        ner = dummy_ner
-        logger.critical("Using dummy ML functions")
+    def _execute(self, batch: List[Tuple[Any, Future]]) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"{self.name} batch returned {len(results)} results for {len(items)} inputs")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(items)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch counters and the average batch fill rate."""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "fill_rate": self.items / (self.batches * self.max_batch_size) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0
+        }
+
+def _zero_shot_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    results = classifier(texts, candidate_labels=INTENTS_LIST, hypothesis_template=HYPOTHESIS_TEMPLATE)
+    return [results] if isinstance(results, dict) else results
+
+def _ner_batch(texts: List[str]) -> List[List[Dict]]:
+    results = ner(texts)
+    # A single-item batch may come back unnested
+    if len(texts) == 1 and (not results or isinstance(results[0], dict)):
+        return [results]
+    return results
+
+zero_shot_batcher = MicroBatcher("zero-shot", _zero_shot_batch)
+ner_batcher = MicroBatcher("ner", _ner_batch)
+
+def get_batching_stats() -> Dict[str, Dict[str, Any]]:
+    """Return fill-rate metrics for the zero-shot and NER batchers."""
+    return {"zero_shot": zero_shot_batcher.stats(), "ner": ner_batcher.stats()}
 
 def preprocess_text(text: str) -> str:
     """Clean and standardize input text."""
@@ -136,6 +385,82 @@ def preprocess_text(text: str) -> str:
     text = re.sub(r"[,.!?;]", " ", text) # Remove punctuation
     return " ".join(text.split()) # Normalize whitespace
 
+class KeywordSpan(NamedTuple):
+    start: int
+    end: int
+    keyword: str
+    category: str
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton that finds whole-word keyword mentions in one pass."""
+
+    def __init__(self, keywords: List[Tuple[str, str]]):
+        # keywords: (keyword, category) pairs; matching is case-insensitive
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]
+        for keyword, category in keywords:
+            node = 0
+            for ch in keyword.lower():
+                if ch not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[node][ch] = len(self._goto) - 1
+                node = self._goto[node][ch]
+            self._out[node].append((keyword.lower(), category))
+
+        # Breadth-first failure links; each node also reports its suffix matches
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def find(self, text: str) -> List[KeywordSpan]:
+        """Return leftmost-longest, non-overlapping whole-word keyword spans."""
+        lowered = text.lower()
+        if len(lowered) != len(text): # keep offsets aligned with text
+            lowered = "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+        hits = []
+        node = 0
+        for i, ch in enumerate(lowered):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for keyword, category in self._out[node]:
+                start = i + 1 - len(keyword)
+                if not _is_word_char(lowered, start - 1) and not _is_word_char(lowered, i + 1):
+                    hits.append(KeywordSpan(start, i + 1, keyword, category))
+
+        hits.sort(key=lambda span: (span.start, span.start - span.end))
+        spans = []
+        end = 0
+        for span in hits:
+            if span.start >= end:
+                spans.append(span)
+                end = span.end
+        return spans
+
+def _is_word_char(text: str, index: int) -> bool:
+    return 0 <= index < len(text) and (text[index].isalnum() or text[index] == "_")
+
+keyword_index = KeywordAutomaton(
+    [(keyword, "role") for keyword in ROLE_KEYWORDS] + [(keyword, "status") for keyword in STATUS_KEYWORDS]
+)
+
+# Words the loose fallback patterns must not mistake for a team name ("delete alpha" -> alpha, not delete)
+_TEAM_NAME_STOPWORDS = frozenset("""
+    a an the it me my our this that please team teams status state role repo repository member members
+    info information details of for in to from with and is are what what's whats who show display list
+    create add make establish delete remove disband update change set assign promote mark give tell get
+""".split())
+
 def extract_team_name(text: str) -> Optional[str]:
     """Extract team name using regex patterns."""
 
@@ -147,15 +472,18 @@ def extract_team_name(text: str) -> Optional[str]:
         r"(?:create|add|make|establish|set up)\s+(?:a\s+)?(?:new\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)",
         r"(?:delete|remove|disband)\s+team\s+(?P<team_name>[A-Za-z0-9_.-]+)",
         r"(?:update|change|set)\s+(?:the\s+)?(?:team|it)(?:\s+\w+)?\s+(?:to|as)\s+(?P<team_name>[A-Za-z0-9_.-]+)", # Added for status
+        r"\b(?:from|in|of|for)\s+(?:the\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s*[?.!]*$", # "remove bob from alpha"
         r"(?:show\s+(?:team\s+)?)?(?:\"(?P<team_name_quoted>[^\"]+)\"|(?P<team_name_simple>[A-Za-z0-9_.-]+))", # Added for show
         r"(?P<team_name>[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)", # Capitalized words
         r"(?P<team_name>[A-Za-z0-9_.-]+)" # Alphanumeric
     ]
 
     for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group("team_name") or match.group("team_name_quoted") or match.group("team_name_simple")
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            groups = match.groupdict() # only the show pattern has the quoted/simple alternatives
+            name = groups.get("team_name") or groups.get("team_name_quoted") or groups.get("team_name_simple")
+            if name and name.lower() not in _TEAM_NAME_STOPWORDS:
+                return name
 
     return None
 
@@ -163,7 +491,7 @@ def extract_members(text: str) -> Optional[List[str]]:
     """Extract team members from text."""
 
     patterns = [
-    r"(?:members are|members to add are|add members)\s+(?P<members>.+?)(?:\.|\band\b|\|to\)",
+    r"(?:members are|members to add are|add members)\s+(?P<members>.+?)(?:\.|\band\b|\||\bto\b)",
     r"members\s*\:\s*(?P<members>.+?)(?:\.|\band\b|\|)",
     r"(?:with members|consisting of|comprised of)\s+(?P<members>.+?)(?:\.|\band\b|\|)",
     r"(?:update\|change)\s+members\s+(?:of\|for\|to)\s+(?P<members>.+?)(?:\.|\band\b|\|)"
@@ -176,24 +504,40 @@ def extract_members(text: str) -> Optional[List[str]]:
 
     return None
 
-def extract_status(text: str) -> Optional[str]:
+_STATUS_BEFORE = [
+    re.compile(r"(?:status|state)\s+(?:(?:to|as|of|is)\s+)?$", re.IGNORECASE),
+    None, # _STATUS_AFTER applies instead
+    re.compile(r"(?:set|mark|change|update)\s+(?:the\s+)?(?:team|it)(?:\s+\w+)?\s+(?:to|as)\s+$", re.IGNORECASE)
+]
+_STATUS_AFTER = re.compile(r"\s+(?:status|state|(?:\w+\s+)?teams\b)", re.IGNORECASE) # "active teams" filters list_teams
+_STATUS_FREE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"(?:update|change|set)\s+team\s+[A-Za-z0-9_.-]+\s+status\s+to\s+(?P<status_free>[A-Za-z\s]+)",
+    r"(?:update|change|set)\s+status\s+of\s+team\s+[A-Za-z0-9_.-]+\s+to\s+(?P<status_free>[A-Za-z\s]+)",
+    r"(?:update|change|set)\s+the\s+status\s+for\s+team\s+[A-Za-z0-9_.-]+\s+to\s+(?P<status_free>[A-Za-z\s]+)",
+    r"(?:update|change|set)\s+team\s+[A-Za-z0-9_.-]+\s+to\s+(?P<status_free>[A-Za-z\s]+)\s+status",
+    r"(?:update|change|set)\s+status\s+to\s+(?P<status_free>[A-Za-z\s]+)\s+for\s+team\s+[A-Za-z0-9_.-]+",
+)]
+
+def extract_status(text: str, spans: Optional[List["KeywordSpan"]] = None) -> Optional[str]:
     """Extract team status from text."""
 
-    patterns = [
-        r"(?:status|state)\s+(?:to|as|of|is)\s+(?P<status>" + "|".join(map(re.escape, STATUS_KEYWORDS)) + ")",
-        r"(?P<status>" + "|".join(map(re.escape, STATUS_KEYWORDS)) + ")\s+(?:status|state)",
-        r"(?:set|mark|change|update)\s+(?:the\s+)?(?:team|it)(?:\s+\w+)?\s+(?:to|as)\s+(?P<status>" + "|".join(map(re.escape, STATUS_KEYWORDS)) + ")",
-        r"(?:update|change|set)\s+team\s+[A-Za-z0-9_.-]+\s+status\s+to\s+(?P<status_free>[A-Za-z\s]+)",
-        r"(?:update|change|set)\s+status\s+of\s+team\s+[A-Za-z0-9_.-]+\s+to\s+(?P<status_free>[A-Za-z\s]+)",
-        r"(?:update|change|set)\s+the\s+status\s+for\s+team\s+[A-Za-z0-9_.-]+\s+to\s+(?P<status_free>[A-Za-z\s]+)",
-        r"(?:update|change|set)\s+team\s+[A-Za-z0-9_.-]+\s+to\s+(?P<status_free>[A-Za-z\s]+)\s+status",
-        r"(?:update|change|set)\s+status\s+to\s+(?P<status_free>[A-Za-z\s]+)\s+for\s+team\s+[A-Za-z0-9_.-]+)",
-    ]
+    if spans is None:
+        spans = keyword_index.find(text)
+    statuses = [span for span in spans if span.category == "status"]
 
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    # Keyword statuses, checked against the surrounding context in priority order
+    for before in _STATUS_BEFORE:
+        for span in statuses:
+            if before is None:
+                if _STATUS_AFTER.match(text, span.end):
+                    return text[span.start:span.end]
+            elif before.search(text, 0, span.start):
+                return text[span.start:span.end]
+
+    for pattern in _STATUS_FREE_PATTERNS:
+        match = pattern.search(text)
         if match:
-            return match.group("status") or match.group("status_free")
+            return match.group("status_free")
 
     return None
 
@@ -201,7 +545,7 @@ def extract_repo(text: str) -> Optional[str]:
     """Extract repository URL from text."""
 
     patterns = [
-        r'https?://\S+', # Direct URL
+        r'(?P<repo>https?://\S+)', # Direct URL
         r"(?:repo|repository|link)\s+(?:is|to|as|of)\s+(?P<repo>https?://\S+)",
         r"(?:repo|repository|link):\s*(?P<repo>https?://\S+)",
         r"(?:update|change|set)\s+(?:the\s+)?repo(?:sitory)?\s+(?:to|as|of)\s+(?P<repo>https?://\S+)",
@@ -215,20 +559,33 @@ def extract_repo(text: str) -> Optional[str]:
 
     return None
 
-def extract_role(text: str) -> Optional[str]:
+_ROLE_BEFORE = [
+    re.compile(r"\b(?:as|to be|to|is|a|an)\s+$", re.IGNORECASE),
+    None, # _ROLE_AFTER applies instead
+    re.compile(r"role\s+(?:(?:of|as|to|is)\s+)?$", re.IGNORECASE)
+]
+_ROLE_AFTER = re.compile(r"\s+(?:role|position|title|teams\b)", re.IGNORECASE)
+_ROLE_FREE_PATTERN = re.compile(r"(?:promote|assign)\s+[A-Za-z]+\s+(?:to|as)\s+(?P<role_free>[a-zA-Z\s]+)", re.IGNORECASE)
+
+def extract_role(text: str, spans: Optional[List["KeywordSpan"]] = None) -> Optional[str]:
     """Extract role information from text."""
 
-    patterns = [
-        r"(?:as|to be|to|is|as a|as an|a|an)\s+(?P<role>" + "|".join(map(re.escape, ROLE_KEYWORDS)) + ")",
-        r"(?P<role>" + "|".join(map(re.escape, ROLE_KEYWORDS)) + ")\s+(?:role|position|title)",
-        r"role\s+(?:of|as|to)\s+(?P<role>" + "|".join(map(re.escape, ROLE_KEYWORDS)) + ")",
-        r"(?:promote|assign)\s+[A-Za-z]+\s+(?:to|as)\s+(?P<role_free>[a-zA-Z\s]+)"
-    ]
+    if spans is None:
+        spans = keyword_index.find(text)
+    roles = [span for span in spans if span.category == "role"]
 
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group("role") or match.group("role_free")
+    # Keyword roles, checked against the surrounding context in priority order
+    for before in _ROLE_BEFORE:
+        for span in roles:
+            if before is None:
+                if _ROLE_AFTER.match(text, span.end):
+                    return text[span.start:span.end]
+            elif before.search(text, 0, span.start):
+                return text[span.start:span.end]
+
+    match = _ROLE_FREE_PATTERN.search(text)
+    if match:
+        return match.group("role_free")
 
     return None
 
@@ -266,208 +623,514 @@ def extract_person_name(text: str, ner_results: List[Dict]) -> Optional[str]:
 
     return None
 
-def extract_entities(text: str, ner_results: List[Dict]) -> Dict[str, Any]:
-    """Extract all entities from text using multiple methods."""
+ENTITY_EXTRACTORS = {
+    "name": extract_person_name,
+    "role": extract_role,
+    "team_name": extract_team_name,
+    "repo": extract_repo,
+    "members": extract_members,
+    "status": extract_status
+}
+
+class ExtractionPlan(NamedTuple):
+    """Entities an intent's handler uses, and whether the NER pass is needed for them."""
+    entities: Tuple[str, ...]
+    needs_ner: bool
+
+FULL_EXTRACTION_PLAN = ExtractionPlan(tuple(ENTITY_EXTRACTORS), True)
+
+# Intents missing here (e.g. "unknown") fall back to FULL_EXTRACTION_PLAN
+EXTRACTION_PLANS = {
+    "assign_role": ExtractionPlan(("name", "role", "team_name"), True),
+    "update_team_repo": ExtractionPlan(("team_name", "repo"), False),
+    "update_team_members": ExtractionPlan(("team_name", "members"), False),
+    "update_team_status": ExtractionPlan(("team_name", "status"), False),
+    "update_team_role": ExtractionPlan(("team_name", "role"), False),
+    "show_team_info": ExtractionPlan(("team_name",), False),
+    "remove_member": ExtractionPlan(("name", "team_name"), True),
+    "list_teams": ExtractionPlan(("status", "role"), False), # optional list filters
+    "get_member_info": ExtractionPlan(("name",), True),
+    "help": ExtractionPlan((), False),
+    "greeting": ExtractionPlan((), False),
+    "create_team": ExtractionPlan((), False),
+    "delete_team": ExtractionPlan(("team_name",), False)
+}
+
+def get_extraction_plan(intent: str) -> ExtractionPlan:
+    """Return the extraction plan for intent."""
+    return EXTRACTION_PLANS.get(intent, FULL_EXTRACTION_PLAN)
 
-    entities = {
-        "name": extract_person_name(text, ner_results),
-        "role": extract_role(text),
-        "team_name": extract_team_name(text),
-        "repo": extract_repo(text),
-        "members": extract_members(text),
-        "status": extract_status(text)
-    }
+def extract_entities(text: str, ner_results: List[Dict], entity_names: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+    """Extract the requested entities (all by default) from text using multiple methods."""
+
+    entities = {}
+    keyword_spans = None
+    for entity_name in (entity_names if entity_names is not None else ENTITY_EXTRACTORS):
+        if entity_name == "name":
+            entities[entity_name] = extract_person_name(text, ner_results)
+        elif entity_name in ("role", "status"):
+            if keyword_spans is None:
+                keyword_spans = keyword_index.find(text) # one pass serves both extractors
+            entities[entity_name] = ENTITY_EXTRACTORS[entity_name](text, keyword_spans)
+        else:
+            entities[entity_name] = ENTITY_EXTRACTORS[entity_name](text)
 
     return {k: v for k, v in entities.items() if v is not None} # Filter out None
 
-def enhanced_intent_classification(text: str) -> Tuple[str, float]:
-    """Enhance intent classification using semantic patterns and zero-shot."""
+_ROLE_ALTERNATION = "|".join(map(re.escape, ROLE_KEYWORDS))
+_STATUS_ALTERNATION = "|".join(map(re.escape, STATUS_KEYWORDS))
+
+# Ordered by priority: the first intent with a matching pattern wins
+INTENT_PATTERNS = [
+    ("list_teams", [
+        r"(?i)(show|list|display|give|what|get)\s+(all|the|all the|)\s*(teams|team)",
+        r"(?i)(show\s+all\s+teams)",
+        r"(?i)(list\s+all\s+teams )",
+        r"(?i)(show\s+all\s+the\s+teams )",
+        r"(?i)(list\s+all\s+the\s+teams )",
+        r"(?i)(what|which)\s+(teams|team)\s+(do we have|exist|are there)",
+        r"(?i)(what|which)\s+(teams|team)\s+(are\s+there)",
+        r"(?i)teams\s+(list|show)",
+        r"(?i)all\s+teams",
+        r"(?i)teams" # Short query
+    ]),
+    ("create_team", [
+        r"(?i)(create|add|make|establish|set up)\s+(a\s+)?(new\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)",
+        r"(?i)(create|add|make|establish|set up)\s+team",
+        r"(?i)new\s+team"
+    ]),
+    ("delete_team", [
+        r"(?i)(delete|remove|disband|eliminate|dissolve|deactivate)\s+(a\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)",
+        r"(?i)(delete|remove|disband|eliminate|dissolve|deactivate)\s+team"
+    ]),
+    ("get_member_info", [
+        r"(?i)(show|display|get)\s+(information|info|details)\s+(for|about|of|on)\s+(?P<name>[A-Za-z]+)",
+        r"(?i)(what|which)\s+(role|position|title)\s+(does|is|has)\s+(?P<name>[A-Za-z]+)",
+        r"(?i)(member|person)\s+information\s+(for|about|of|on)\s+(?P<name>[A-Za-z]+)",
+        r"(?i)who is\s+(?P<name>[A-Za-z]+)",
+        r"(?i)tell me about\s+(?P<name>[A-Za-z]+)",
+        r"(?i)info\s+(for|about|of|on)\s+(?P<name>[A-Za-z]+)", # Short query
+        r"(?i)(show|get|display)\s+(info|information|details)\s+(for|about|of)\s+([A-Za-z]+)"
+    ]),
+    ("show_team_info", [
+        r"(?i)(show|list|display|get)\s+(all\s+)?teams?",
+        r"(?i)(what|which)\s+teams?",
+        r"(?i)teams\s+(list|show|display)?",
+        r"(?i)(show|display|get)\s+(team\s+)?information\s+(for\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
+        r"(?i)(what is|show|display|get)\s+(the\s+)?(team's|team)\s+(status|details|info)\s+(for\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
+        r"(?i)team\s+(information|details|info)\s+(for\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
+        r"(?i)(team\s+)?status\s+(for\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
+        r"(?i)team\s+info\s+(for\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
+        r"(?i)(team's|team)\s+(status|details|info)\s+(for\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
+        r"(?i)(show|display|get)\s+(team\s+)?info", # Short query
+        r"(?i)(what is|show|display|get)\s+(the\s+)?team's\s+status", # Short query
+        r"(?i)team\s+information", # Short query
+        r"(?i)team\s+details", # Short query
+        r"(?i)team\s+info" # Short query
+    ]),
+    ("assign_role", [
+        r"(?i)(assign|give|set|allocate|promote)\s+(a\s+)?role\s+(to|for)\s+(?P<name>[A-Za-z]+)\s+(?:in\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)?\s+(?:as|to be|to|is)\s+(?P<role>" + _ROLE_ALTERNATION + ")",
+        r"(?i)(assign|give|set|allocate|promote)\s+(?P<name>[A-Za-z]+)\s+(?:to|as)\s+(a\s+)?(?P<role>" + _ROLE_ALTERNATION + ")\s+(?:in\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)?",
+        r"(?i)(assign|give|set|allocate|promote)\s+(?P<name>[A-Za-z]+)\s+(a\s+)?(?P<role_free>[a-zA-Z\s]+)\s+(?:role|position|title)\s+(?:in\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)?",
+        r"(?i)(assign|give|set|allocate|promote)\s+(?P<name>[A-Za-z]+)\s+(?:in\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)?\s+(?:to|as)\s+(a\s+)?(?P<role>" + _ROLE_ALTERNATION + ")",
+        r"(?i)(assign|give|set|allocate|promote)\s+(a\s+)?role\s+(to|for)\s+(?P<name>[A-Za-z]+)", # Short query
+        r"(?i)(assign|give|set|allocate|promote)\s+(?P<name>[A-Za-z]+)\s+(?:to|as)\s+(a\s+)?(?P<role>" + _ROLE_ALTERNATION + ")", # Short query
+        r"(?i)(assign|give|set|allocate|promote)\s+(?P<name>[A-Za-z]+)\s+(a\s+)?(?P<role_free>[a-zA-Z\s]+)\s+(?:role|position|title)" # Short query
+    ]),
+    ("update_team_repo", [
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(repo(?:sitory)?|code location|link)\s+(to|as|is)\s+(?P<repo>https?://\S+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(repo(?:sitory)?|code location|link)\s+(?P<repo>https?://\S+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?repo(?:sitory)?\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as|is)\s+(?P<repo>https?://\S+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?repo(?:sitory)?\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<repo>https?://\S+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as|is)\s+(?P<repo>https?://\S+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<repo>https?://\S+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?repo(?:sitory)?\s+(to|as|is)\s+(?P<repo>https?://\S+)", # Short query
+        r"(?i)(change|set|modify|update)\s+(the\s+)?repo(?:sitory)?\s+(?P<repo>https?://\S+)" # Short query
+    ]),
+    ("update_team_members", [
+        r"(?i)(add|remove|change|modify|update)\s+(the\s+)?members\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as|with)\s+(?P<members>.+)",
+        r"(?i)(add|remove|change|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(members|membership)\s+(to|as|with)\s+(?P<members>.+)",
+        r"(?i)(add|remove|change|modify|update)\s+(the\s+)?members\s+(to|as|with)\s+(?P<members>.+)\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
+        r"(?i)(add|remove|change|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as|with)\s+(?P<members>.+)",
+        r"(?i)(add|remove|change|modify|update)\s+(members)\s+(to|as|with)\s+(?P<members>.+)", # Short query
+        r"(?i)(add|remove|change|modify|update)\s+(members)\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)" # Short query
+    ]),
+    ("update_team_status", [
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+status\s+(to|as)\s+(?P<status>" + _STATUS_ALTERNATION + ")",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+status\s+(to|as)\s+(?P<status_free>[a-zA-Z\s]+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?status\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<status>" + _STATUS_ALTERNATION + ")",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?status\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<status_free>[a-zA-Z\s]+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<status>" + _STATUS_ALTERNATION + ")",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<status_free>[a-zA-Z\s]+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<status>" + _STATUS_ALTERNATION + ")",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<status_free>[a-zA-Z\s]+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?status\s+(to|as)\s+(?P<status>" + _STATUS_ALTERNATION + ")", # Short query
+        r"(?i)(change|set|modify|update)\s+(the\s+)?status\s+(to|as)\s+(?P<status_free>[a-zA-Z\s]+)", # Short query
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+status", # Short query
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<status_keyword>active|inactive|on hold|completed|planning|in progress|pending|archived|paused|delayed|blocked|complete)",
+        r"(?i)(change|set|modify|update)\s+status\s+of\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+to\s+(?P<status_keyword>active|inactive|on hold|completed|planning|in progress|pending|archived|paused|delayed|blocked|complete)"
+    ]),
+    ("update_team_role", [
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+role\s+(to|as)\s+(?P<role>" + _ROLE_ALTERNATION + ")",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+role\s+(to|as)\s+(?P<role_free>[a-zA-Z\s]+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?role\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<role>" + _ROLE_ALTERNATION + ")",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?role\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<role_free>[a-zA-Z\s]+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<role>" + _ROLE_ALTERNATION + ")",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<role_free>[a-zA-Z\s]+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<role>" + _ROLE_ALTERNATION + ")",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<role_free>[a-zA-Z\s]+)",
+        r"(?i)(change|set|modify|update)\s+(the\s+)?role\s+(to|as)\s+(?P<role>" + _ROLE_ALTERNATION + ")", # Short query
+        r"(?i)(change|set|modify|update)\s+(the\s+)?role\s+(to|as)\s+(?P<role_free>[a-zA-Z\s]+)", # Short query
+        r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+role" # Short query
+    ]),
+    ("remove_member", [
+        r"(?i)(remove|delete|kick out|exclude)\s+(?P<name>[A-Za-z]+)\s+from\s+(?:team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
+        r"(?i)(remove|delete|kick out|exclude)\s+(?P<name>[A-Za-z]+)\s+from\s+the\s+team",
+        r"(?i)(remove|delete|kick out|exclude)\s+member\s+(?P<name>[A-Za-z]+)\s+from\s+(?:team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
+        r"(?i)(remove|delete|kick out|exclude)\s+member\s+(?P<name>[A-Za-z]+)\s+from\s+the\s+team",
+        r"(?i)(remove|delete|kick out|exclude)\s+from\s+(?:team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<name>[A-Za-z]+)",
+        r"(?i)(remove|delete|kick out|exclude)\s+(?P<name>[A-Za-z]+)\s+from\s+team", # Short query
+        r"(?i)remove\s+(?P<name>[A-Za-z]+)", # Very short query
+        r"(?i)delete\s+(?P<name>[A-Za-z]+)"  # Very short query
+    ]),
+    ("help", [
+        r"(?i)help",
+        r"(?i)what can you do",
+        r"(?i)commands",
+        r"(?i)what are the commands"
+    ]),
+    ("greeting", [
+        r"(?i)hello",
+        r"(?i)hi",
+        r"(?i)hey",
+        r"(?i)greetings"
+    ])
+]
+
+# Literal substrings that every pattern of the intent requires; an intent's
+# patterns are only tried when one of its triggers occurs in the text.
+INTENT_TRIGGERS = {
+    "list_teams": ["team"],
+    "create_team": ["team"],
+    "delete_team": ["team"],
+    "get_member_info": ["info", "details", "role", "position", "title", "who is", "tell me about"],
+    "show_team_info": ["team", "status", "info"],
+    "assign_role": ["assign", "give", "set", "allocate", "promote"],
+    "update_team_repo": ["change", "set", "modify", "update"],
+    "update_team_members": ["add", "remove", "change", "modify", "update"],
+    "update_team_status": ["change", "set", "modify", "update"],
+    "update_team_role": ["change", "set", "modify", "update"],
+    "remove_member": ["remove", "delete", "kick out", "exclude"],
+    "help": ["help", "what can you do", "commands"],
+    "greeting": ["hello", "hi", "hey", "greetings"]
+}
+
+class IntentMatcher:
+    """Regex intent tier compiled once, with single-pass trigger prefiltering."""
+
+    def __init__(self, intent_patterns: List[Tuple[str, List[str]]], triggers: Dict[str, List[str]]):
+        self._rules = [(intent, [(p, re.compile(p)) for p in patterns]) for intent, patterns in intent_patterns]
+        keywords = sorted({k for words in triggers.values() for k in words}, key=len, reverse=True)
+        # Zero-width lookahead reports every start position, longest trigger first
+        self._trigger_re = re.compile("(?=(" + "|".join(map(re.escape, keywords)) + "))", re.IGNORECASE)
+        # A longer trigger found at a position implies every trigger that is its prefix
+        self._intents_for = {
+            k: {intent for intent, words in triggers.items() for w in words if k.startswith(w)}
+            for k in keywords
+        }
+
+    def candidate_intents(self, text: str) -> set:
+        """Return the intents whose trigger words occur in text."""
+        found = set()
+        for m in self._trigger_re.finditer(text):
+            found |= self._intents_for[m.group(1).lower()]
+        return found
+
+    def match(self, text: str) -> Optional[Tuple[str, str]]:
+        """Return (intent, pattern) for the first pattern that fires, or None."""
+        candidates = self.candidate_intents(text)
+        for intent, patterns in self._rules:
+            if intent not in candidates:
+                continue
+            for source, compiled in patterns:
+                if compiled.search(text):
+                    return intent, source
+        return None
+
+intent_matcher = IntentMatcher(INTENT_PATTERNS, INTENT_TRIGGERS)
+
+_intent_model: Optional[HashedNgramIntentModel] = None
+_intent_model_checked = False
+_intent_model_lock = threading.Lock()
+
+def get_intent_model() -> Optional[HashedNgramIntentModel]:
+    """Load the trained intent model from INTENT_MODEL_PATH once, if it exists."""
+    global _intent_model, _intent_model_checked
+    with _intent_model_lock:
+        if not _intent_model_checked:
+            _intent_model_checked = True
+            if os.path.exists(INTENT_MODEL_PATH):
+                try:
+                    _intent_model = HashedNgramIntentModel.load(INTENT_MODEL_PATH)
+                    logger.info(f"Intent model {_intent_model.version} loaded from {INTENT_MODEL_PATH}")
+                except Exception as e:
+                    logger.warning(f"Intent model tier disabled: {e}")
+    return _intent_model
+
+def _log_traffic(text: str, intent: str, confidence: float, tier: str) -> Tuple[str, float]:
+    if INTENT_TRAFFIC_LOG:
+        traffic_logger.info(json.dumps({"text": text, "intent": intent, "confidence": round(float(confidence), 4), "tier": tier}))
+    return intent, confidence
+
+def enhanced_intent_classification(text: str, use_models: Optional[bool] = None) -> Tuple[str, float]:
+    """Classify intent with a cascade: regex, trained model, embeddings, then zero-shot."""
 
     cleaned_text = preprocess_text(text)
+    if use_models is None:
+        use_models = _models_loaded.is_set()
 
-    intent_patterns = [
-        ("list_teams", [
-            r"(?i)(show|list|display|give|what|get)\s+(all|the|all the|)\s*(teams|team)",
-            r"(?i)(show\s+all\s+teams)",
-            r"(?i)(list\s+all\s+teams )",
-            r"(?i)(show\s+all\s+the\s+teams )",
-            r"(?i)(list\s+all\s+the\s+teams )",
-            r"(?i)(what|which)\s+(teams|team)\s+(do we have|exist|are there)",
-            r"(?i)(what|which)\s+(teams|team)\s+(are\s+there)",
-            r"(?i)teams\s+(list|show)",
-            r"(?i)all\s+teams",
-            r"(?i)teams" # Short query
-        ]),
-        ("create_team", [
-            r"(?i)(create|add|make|establish|set up)\s+(a\s+)?(new\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)",
-            r"(?i)(create|add|make|establish|set up)\s+team",
-            r"(?i)new\s+team"
-        ]),
-        ("delete_team", [
-            r"(?i)(delete|remove|disband|eliminate|dissolve|deactivate)\s+(a\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)",
-            r"(?i)(delete|remove|disband|eliminate|dissolve|deactivate)\s+team"
-        ]),
-        ("get_member_info", [
-            r"(?i)(show|display|get)\s+(information|info|details)\s+(for|about|of|on)\s+(?P<name>[A-Za-z]+)",
-            r"(?i)(what|which)\s+(role|position|title)\s+(does|is|has)\s+(?P<name>[A-Za-z]+)",
-            r"(?i)(member|person)\s+information\s+(for|about|of|on)\s+(?P<name>[A-Za-z]+)",
-            r"(?i)who is\s+(?P<name>[A-Za-z]+)",
-            r"(?i)tell me about\s+(?P<name>[A-Za-z]+)",
-            r"(?i)info\s+(for|about|of|on)\s+(?P<name>[A-Za-z]+)", # Short query
-            r"(?i)(show|get|display)\s+(info|information|details)\s+(for|about|of)\s+([A-Za-z]+)"
-        ]),
-       ("show_team_info", [
-            r"(?i)(show|list|display|get)\s+(all\s+)?teams?",
-            r"(?i)(what|which)\s+teams?",
-            r"(?i)teams\s+(list|show|display)?",
-            r"(?i)(show|display|get)\s+(team\s+)?information\s+(for\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
-            r"(?i)(what is|show|display|get)\s+(the\s+)?(team's|team)\s+(status|details|info)\s+(for\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
-            r"(?i)team\s+(information|details|info)\s+(for\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
-            r"(?i)(team\s+)?status\s+(for\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
-            r"(?i)team\s+info\s+(for\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
-            r"(?i)(team's|team)\s+(status|details|info)\s+(for\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
-            r"(?i)(show|display|get)\s+(team\s+)?info", # Short query
-            r"(?i)(what is|show|display|get)\s+(the\s+)?team's\s+status", # Short query
-            r"(?i)team\s+information", # Short query
-            r"(?i)team\s+details", # Short query
-            r"(?i)team\s+info" # Short query
-        ]),
-        ("assign_role", [
-            r"(?i)(assign|give|set|allocate|promote)\s+(a\s+)?role\s+(to|for)\s+(?P<name>[A-Za-z]+)\s+(?:in\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)?\s+(?:as|to be|to|is)\s+(?P<role>" + "|".join(map(re.escape, ROLE_KEYWORDS)) + ")",
-            r"(?i)(assign|give|set|allocate|promote)\s+(?P<name>[A-Za-z]+)\s+(?:to|as)\s+(a\s+)?(?P<role>" + "|".join(map(re.escape, ROLE_KEYWORDS)) + ")\s+(?:in\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)?",
-            r"(?i)(assign|give|set|allocate|promote)\s+(?P<name>[A-Za-z]+)\s+(a\s+)?(?P<role_free>[a-zA-Z\s]+)\s+(?:role|position|title)\s+(?:in\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)?",
-            r"(?i)(assign|give|set|allocate|promote)\s+(?P<name>[A-Za-z]+)\s+(?:in\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)?\s+(?:to|as)\s+(a\s+)?(?P<role>" + "|".join(map(re.escape, ROLE_KEYWORDS)) + ")",
-            r"(?i)(assign|give|set|allocate|promote)\s+(a\s+)?role\s+(to|for)\s+(?P<name>[A-Za-z]+)", # Short query
-            r"(?i)(assign|give|set|allocate|promote)\s+(?P<name>[A-Za-z]+)\s+(?:to|as)\s+(a\s+)?(?P<role>" + "|".join(map(re.escape, ROLE_KEYWORDS)) + ")", # Short query
-            r"(?i)(assign|give|set|allocate|promote)\s+(?P<name>[A-Za-z]+)\s+(a\s+)?(?P<role_free>[a-zA-Z\s]+)\s+(?:role|position|title)" # Short query
-        ]),
-        ("update_team_repo", [
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(repo(?:sitory)?|code location|link)\s+(to|as|is)\s+(?P<repo>https?://\S+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(repo(?:sitory)?|code location|link)\s+(?P<repo>https?://\S+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?repo(?:sitory)?\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as|is)\s+(?P<repo>https?://\S+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?repo(?:sitory)?\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<repo>https?://\S+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as|is)\s+(?P<repo>https?://\S+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<repo>https?://\S+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?repo(?:sitory)?\s+(to|as|is)\s+(?P<repo>https?://\S+)", # Short query
-            r"(?i)(change|set|modify|update)\s+(the\s+)?repo(?:sitory)?\s+(?P<repo>https?://\S+)" # Short query
-        ]),
-        ("update_team_members", [
-            r"(?i)(add|remove|change|modify|update)\s+(the\s+)?members\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as|with)\s+(?P<members>.+)",
-            r"(?i)(add|remove|change|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(members|membership)\s+(to|as|with)\s+(?P<members>.+)",
-            r"(?i)(add|remove|change|modify|update)\s+(the\s+)?members\s+(to|as|with)\s+(?P<members>.+)\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
-            r"(?i)(add|remove|change|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as|with)\s+(?P<members>.+)",
-            r"(?i)(add|remove|change|modify|update)\s+(members)\s+(to|as|with)\s+(?P<members>.+)", # Short query
-            r"(?i)(add|remove|change|modify|update)\s+(members)\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)" # Short query
-        ]),
-        ("update_team_status", [
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+status\s+(to|as)\s+(?P<status>" + "|".join(map(re.escape, STATUS_KEYWORDS)) + ")",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+status\s+(to|as)\s+(?P<status_free>[a-zA-Z\s]+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?status\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<status>" + "|".join(map(re.escape, STATUS_KEYWORDS)) + ")",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?status\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<status_free>[a-zA-Z\s]+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<status>" + "|".join(map(re.escape, STATUS_KEYWORDS)) + ")",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<status_free>[a-zA-Z\s]+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<status>" + "|".join(map(re.escape, STATUS_KEYWORDS)) + ")",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<status_free>[a-zA-Z\s]+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?status\s+(to|as)\s+(?P<status>" + "|".join(map(re.escape, STATUS_KEYWORDS)) + ")", # Short query
-            r"(?i)(change|set|modify|update)\s+(the\s+)?status\s+(to|as)\s+(?P<status_free>[a-zA-Z\s]+)", # Short query
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+status", # Short query
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<status_keyword>active|inactive|on hold|completed|planning|in progress|pending|archived|paused|delayed|blocked|complete)",
-            r"(?i)(change|set|modify|update)\s+status\s+of\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+to\s+(?P<status_keyword>active|inactive|on hold|completed|planning|in progress|pending|archived|paused|delayed|blocked|complete)"
-        ]),
-        ("update_team_role", [
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+role\s+(to|as)\s+(?P<role>" + "|".join(map(re.escape, ROLE_KEYWORDS)) + ")",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+role\s+(to|as)\s+(?P<role_free>[a-zA-Z\s]+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?role\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<role>" + "|".join(map(re.escape, ROLE_KEYWORDS)) + ")",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?role\s+(of\s+team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<role_free>[a-zA-Z\s]+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<role>" + "|".join(map(re.escape, ROLE_KEYWORDS)) + ")",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(to|as)\s+(?P<role_free>[a-zA-Z\s]+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<role>" + "|".join(map(re.escape, ROLE_KEYWORDS)) + ")",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<role_free>[a-zA-Z\s]+)",
-            r"(?i)(change|set|modify|update)\s+(the\s+)?role\s+(to|as)\s+(?P<role>" + "|".join(map(re.escape, ROLE_KEYWORDS)) + ")", # Short query
-            r"(?i)(change|set|modify|update)\s+(the\s+)?role\s+(to|as)\s+(?P<role_free>[a-zA-Z\s]+)", # Short query
-            r"(?i)(change|set|modify|update)\s+(the\s+)?team\s+(?P<team_name>[A-Za-z0-9_.-]+)\s+role" # Short query
-        ]),
-        ("remove_member", [
-            r"(?i)(remove|delete|kick out|exclude)\s+(?P<name>[A-Za-z]+)\s+from\s+(?:team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
-            r"(?i)(remove|delete|kick out|exclude)\s+(?P<name>[A-Za-z]+)\s+from\s+the\s+team",
-            r"(?i)(remove|delete|kick out|exclude)\s+member\s+(?P<name>[A-Za-z]+)\s+from\s+(?:team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)",
-            r"(?i)(remove|delete|kick out|exclude)\s+member\s+(?P<name>[A-Za-z]+)\s+from\s+the\s+team",
-            r"(?i)(remove|delete|kick out|exclude)\s+from\s+(?:team\s+)?(?P<team_name>[A-Za-z0-9_.-]+)\s+(?P<name>[A-Za-z]+)",
-            r"(?i)(remove|delete|kick out|exclude)\s+(?P<name>[A-Za-z]+)\s+from\s+team", # Short query
-            r"(?i)remove\s+(?P<name>[A-Za-z]+)", # Very short query
-            r"(?i)delete\s+(?P<name>[A-Za-z]+)"  # Very short query
-        ]),
-        ("help", [
-            r"(?i)help",
-            r"(?i)what can you do",
-            r"(?i)commands",
-            r"(?i)what are the commands"
-        ]),
-        ("greeting", [
-            r"(?i)hello",
-            r"(?i)hi",
-            r"(?i)hey",
-            r"(?i)greetings"
-        ])
-    ]
+    pattern_match = intent_matcher.match(cleaned_text)
+    if pattern_match:
+        intent, pattern = pattern_match
+        logger.info(f"Intent '{intent}' matched with pattern: '{pattern}' for text: '{cleaned_text}'")
+        return _log_traffic(cleaned_text, intent, 0.95, "regex") # High confidence for pattern match
 
-    for intent, patterns in intent_patterns:
-        for pattern in patterns:
-            match = re.search(pattern, cleaned_text)
-            if match:
-                logger.info(f"Intent '{intent}' matched with pattern: '{pattern}' for text: '{cleaned_text}'")
-                return intent, 0.95 # High confidence for pattern match
+    # Trained n-gram model: cheap enough to run even before the transformers are loaded
+    intent_model = get_intent_model()
+    if intent_model is not None:
+        intent, probability = intent_model.classify(cleaned_text)
+        if probability >= INTENT_MODEL_THRESHOLD:
+            logger.info(f"Intent model predicted intent: '{intent}' with confidence: {probability:.2f} for text: '{cleaned_text}'")
+            return _log_traffic(cleaned_text, intent, probability, "intent-model")
+
+    if not use_models:
+        logger.info(f"Models not loaded; no regex match for text: '{cleaned_text}'")
+        return "unknown", 0.0
 
-    # Fallback to zero-shot classification if no pattern matches
+    # Embedding similarity against INTENT_DESCRIPTIONS: one encoder pass
+    if embedding_classifier is not None:
+        try:
+            intent, similarity = embedding_classifier.classify(cleaned_text)
+            if similarity >= EMBEDDING_THRESHOLD:
+                logger.info(f"Embedding tier predicted intent: '{intent}' with similarity: {similarity:.2f} for text: '{cleaned_text}'")
+                return _log_traffic(cleaned_text, intent, similarity, "embedding")
+        except Exception as e:
+            logger.warning(f"Error during embedding classification: {e}")
+
+    # Fallback to zero-shot classification if nothing above is confident
     try:
         start_time = time.time()
-        zero_shot_result = classifier(cleaned_text, candidate_labels=INTENTS_LIST, hypothesis_template="The user wants to {}.")
+        zero_shot_result = zero_shot_batcher.submit(cleaned_text)
         predicted_intent = zero_shot_result['labels'][0]
         confidence = zero_shot_result['scores'][0]
         end_time = time.time()
         logger.info(f"Zero-shot classification predicted intent: '{predicted_intent}' with confidence: {confidence:.2f} for text: '{cleaned_text}' (took {end_time - start_time:.2f} seconds)")
-        return predicted_intent, confidence
+        return _log_traffic(cleaned_text, predicted_intent, confidence, "zero-shot")
     except Exception as e:
         logger.error(f"Error during zero-shot classification: {e}")
         return "unknown", 0.0
 
-def predict(text: str) -> Tuple[str, Dict[str, Any]]:
+class PredictionCache:
+    """LRU + TTL cache of predict() results, optionally mirrored to SQLite."""
+
+    def __init__(self, version: str, max_entries: int = PREDICTION_CACHE_SIZE, ttl: float = PREDICTION_CACHE_TTL, db_path: str = ""):
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS prediction_cache ("
+                "key TEXT PRIMARY KEY, version TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            # Results from another model or pattern set are stale
+            stale = self._db.execute("DELETE FROM prediction_cache WHERE version != ? OR expires_at < ?", (version, time.time())).rowcount
+            self._db.commit()
+            if stale:
+                logger.info(f"Dropped {stale} stale prediction cache entries from {db_path}")
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return a fresh copy of the cached prediction for key, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._decode(value)
+                del self._entries[key]
+                self.evictions += 1
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM prediction_cache WHERE key = ? AND version = ?", (key, self.version)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return self._decode(row[0])
+            self.misses += 1
+            return None
+
+    def put(self, key: str, prediction: Tuple[str, Dict[str, Any]]) -> None:
+        """Cache a prediction in memory and, when enabled, on disk."""
+        value = json.dumps(prediction)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO prediction_cache (key, version, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, self.version, value, expires_at)
+                )
+                self._db.commit()
+
+    def _store(self, key: str, value: str, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @staticmethod
+    def _decode(value: str) -> Tuple[str, Dict[str, Any]]:
+        intent, entities = json.loads(value)
+        return intent, entities
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit, miss and eviction counters."""
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+def _model_name(model: Any) -> str:
+    return getattr(getattr(model, "model", None), "name_or_path", None) or getattr(model, "__name__", type(model).__name__)
+
+def prediction_cache_version() -> str:
+    """Hash the loaded model names and the pattern/keyword sets that shape predictions."""
+    digest = hashlib.sha256(MODEL_BACKEND.encode())
+    for model in (classifier, ner, embedding_classifier and embedding_classifier.encoder):
+        digest.update(_model_name(model).encode())
+    intent_model = get_intent_model()
+    digest.update((intent_model.version if intent_model is not None else "no-intent-model").encode())
+    digest.update(json.dumps([INTENTS_LIST, INTENT_DESCRIPTIONS, ROLE_KEYWORDS, STATUS_KEYWORDS, INTENT_PATTERNS, INTENT_TRIGGERS, EXTRACTION_PLANS, sorted(_TEAM_NAME_STOPWORDS)]).encode())
+    context_patterns = _STATUS_BEFORE + [_STATUS_AFTER] + _STATUS_FREE_PATTERNS + _ROLE_BEFORE + [_ROLE_AFTER, _ROLE_FREE_PATTERN]
+    digest.update(json.dumps([p.pattern for p in context_patterns if p is not None]).encode())
+    for func in (extract_entities, extract_team_name, extract_members,
+                 extract_status, extract_repo, extract_role, extract_person_name):
+        digest.update(inspect.getsource(func).encode())
+    return digest.hexdigest()[:16]
+
+# Created by load_models(), once the model names are known
+prediction_cache: Optional[PredictionCache] = None
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return prediction cache counters."""
+    return prediction_cache.stats() if prediction_cache is not None else {}
+
+def predict(text: str, use_models: Optional[bool] = None) -> Tuple[str, Dict[str, Any]]:
     """Predict intent and extract entities from the input text."""
     cleaned_text = preprocess_text(text)
-    intent, confidence = enhanced_intent_classification(cleaned_text)
+    if use_models is None:
+        use_models = _models_loaded.is_set()
+    cache = prediction_cache if use_models else None
+    if cache is not None:
+        cached = cache.get(cleaned_text)
+        if cached is not None:
+            logger.info(f"Prediction cache hit for '{cleaned_text}'")
+            return cached
+    intent, confidence = enhanced_intent_classification(cleaned_text, use_models)
+    plan = get_extraction_plan(intent)
     ner_results = []
     try:
-        if classifier != dummy_classifier and ner != dummy_ner:
-            ner_results = ner(cleaned_text)
+        if use_models and plan.needs_ner and ner is not dummy_ner:
+            ner_results = ner_batcher.submit(cleaned_text)
             logger.info(f"NER results for '{cleaned_text}': {ner_results}")
     except Exception as e:
         logger.warning(f"Error during NER: {e}")
 
-    entities = extract_entities(cleaned_text, ner_results)
+    entities = extract_entities(cleaned_text, ner_results, plan.entities)
 
     logger.info(f"Predicted intent: '{intent}' with confidence: {confidence:.2f}, extracted entities: {entities} for text: '{cleaned_text}'")
+    if cache is not None and intent != "unknown": # don't pin transient classifier failures
+        cache.put(cleaned_text, (intent, entities))
     return intent, entities
 
-if __name__ == '__main__':
-    test_commands = [
-        "list all teams",
-        "create a new team Project Phoenix",
-        "delete team Alpha",
-        "show information for Alice",
-        "what is the status of team Beta",
-        "assign the role of lead to Bob in team Gamma",
-        "change the team Delta's repository to https://github.com/example/delta",
-        "add members Carol and David to the team Epsilon",
-        "update the status of team Zeta to in progress",
-        "change the team Eta's role to administrator",
-        "remove Frank from team Theta",
-        "help me",
-        "hello bot",
-        "update team Omega status to completed",
-        "set status of team Sigma to on hold",
-        "change status to planning for team Lambda"
-    ]
+class InferenceQueueFull(RuntimeError):
+    """Raised when too many predictions are already queued."""
+
+_executor: Optional[Executor] = None
+_queue_slots: Optional[asyncio.BoundedSemaphore] = None
 
-    for cmd in test_commands:
+def get_inference_executor() -> Executor:
+    """Create (once) and return the pool that runs predict()."""
+    global _executor
+    if _executor is None:
+        if INFERENCE_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=INFERENCE_WORKERS, initializer=load_models)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="fmodel")
+        logger.info(f"Inference executor started: {INFERENCE_EXECUTOR} pool with {INFERENCE_WORKERS} worker(s), queue size {INFERENCE_QUEUE_SIZE}")
+    return _executor
+
+def shutdown_inference_executor() -> None:
+    """Stop the inference pool, waiting for running predictions."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+async def predict_async(text: str) -> Tuple[str, Dict[str, Any]]:
+    """Run predict() on the inference executor without blocking the event loop."""
+    global _queue_slots
+    if not models_ready():
+        return predict(text, use_models=False) # regex tier is cheap enough to run inline
+    if _queue_slots is None:
+        _queue_slots = asyncio.BoundedSemaphore(INFERENCE_QUEUE_SIZE)
+    if _queue_slots.locked():
+        raise InferenceQueueFull(f"Inference queue is full ({INFERENCE_QUEUE_SIZE} pending)")
+    async with _queue_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_inference_executor(), predict, text)
+
+# Sample commands used by the __main__ demo and the ONNX parity check
+TEST_COMMANDS = [
+    "list all teams",
+    "create a new team Project Phoenix",
+    "delete team Alpha",
+    "show information for Alice",
+    "what is the status of team Beta",
+    "assign the role of lead to Bob in team Gamma",
+    "change the team Delta's repository to https://github.com/example/delta",
+    "add members Carol and David to the team Epsilon",
+    "update the status of team Zeta to in progress",
+    "change the team Eta's role to administrator",
+    "remove Frank from team Theta",
+    "help me",
+    "hello bot",
+    "update team Omega status to completed",
+    "set status of team Sigma to on hold",
+    "change status to planning for team Lambda"
+]
+
+if __name__ == '__main__':
+    load_models()
+    for cmd in TEST_COMMANDS:
         intent, entities = predict(cmd)
-        print(f"Command: '{cmd}' -> Intent: '{intent}', Entities: {entities}")
\ No newline at end of file
+        print(f"Command: '{cmd}' -> Intent: '{intent}', Entities: {entities}")
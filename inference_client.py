@@ -0,0 +1,163 @@
+"""Client for inference_server.py, used by fbot when INFERENCE_SERVER is set.
+
+Keeps a small pool of connections and pipelines requests over them. When the
+server is unreachable or slow, predictions fall back to fmodel's in-process
+regex tier, and the server is not retried for INFERENCE_RETRY_SECONDS after a
+connection failure so each message doesn't pay for a failed connect.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fmodel import InferenceQueueFull, predict
+from inference_protocol import (
+    BUSY, ERROR, PREDICT, RESULT, STATUS, ProtocolError, encode_frame, load_json, open_connection, read_frame
+)
+
+logger = logging.getLogger("inference_client")
+
+INFERENCE_SERVER = os.getenv("INFERENCE_SERVER", "") # empty: load the models in the bot process
+INFERENCE_POOL_SIZE = int(os.getenv("INFERENCE_POOL_SIZE", "4"))
+INFERENCE_TIMEOUT_MS = float(os.getenv("INFERENCE_TIMEOUT_MS", "3000"))
+INFERENCE_CONNECT_TIMEOUT_MS = float(os.getenv("INFERENCE_CONNECT_TIMEOUT_MS", "1000"))
+INFERENCE_RETRY_SECONDS = float(os.getenv("INFERENCE_RETRY_SECONDS", "10"))
+
+class ServerError(Exception):
+    """The inference server could not answer the request."""
+
+class _Connection:
+    """One socket to the server; requests are matched to replies by request id."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self.closed = False
+        self._reader_task = asyncio.create_task(self._read_replies())
+
+    async def request(self, frame_type: int, payload: bytes) -> Tuple[int, bytes]:
+        if self.closed:
+            raise ConnectionError("Inference connection closed")
+        request_id = next(self._ids) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            self.writer.write(encode_frame(frame_type, request_id, payload))
+            await self.writer.drain()
+            return await future
+        finally:
+            self.pending.pop(request_id, None) # also on timeout, so a late reply is dropped
+
+    async def _read_replies(self) -> None:
+        try:
+            while True:
+                frame_type, request_id, payload = await read_frame(self.reader)
+                future = self.pending.get(request_id)
+                if future is not None and not future.done():
+                    future.set_result((frame_type, payload))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = ConnectionError(f"Inference connection lost: {e}")
+        else:
+            error = ConnectionError("Inference connection closed")
+        finally:
+            self.closed = True
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def close(self) -> None:
+        self.closed = True
+        self._reader_task.cancel()
+        self.writer.close()
+
+class InferenceClient:
+    """Pooled, pipelined connections to an inference server, with a regex-tier fallback."""
+
+    def __init__(self, address: str = INFERENCE_SERVER, pool_size: int = INFERENCE_POOL_SIZE,
+                 timeout_ms: float = INFERENCE_TIMEOUT_MS, connect_timeout_ms: float = INFERENCE_CONNECT_TIMEOUT_MS,
+                 retry_seconds: float = INFERENCE_RETRY_SECONDS):
+        self.address = address
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout_ms / 1000
+        self.connect_timeout = connect_timeout_ms / 1000
+        self.retry_seconds = retry_seconds
+        self._connections: List[_Connection] = []
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._retry_at = 0.0
+        self.requests = 0
+        self.fallbacks = 0
+
+    async def _connection(self) -> _Connection:
+        """The least busy open connection, opening another while all are busy and the pool has room."""
+        self._connections = [c for c in self._connections if not c.closed]
+        idle = min(self._connections, key=lambda c: len(c.pending), default=None)
+        if idle is not None and (not idle.pending or len(self._connections) >= self.pool_size):
+            return idle
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if len(self._connections) >= self.pool_size: # filled while we waited for the lock
+                return min(self._connections, key=lambda c: len(c.pending))
+            reader, writer = await asyncio.wait_for(open_connection(self.address), self.connect_timeout)
+            connection = _Connection(reader, writer)
+            self._connections.append(connection)
+            return connection
+
+    async def _request(self, frame_type: int, payload: bytes = b"") -> bytes:
+        """Send one request and return the RESULT payload; raises ConnectionError or TimeoutError on failure."""
+        if time.monotonic() < self._retry_at:
+            raise ConnectionError("Inference server marked unavailable")
+        connection = None
+        try:
+            connection = await self._connection() # a connect timeout counts as unreachable
+            reply_type, reply = await asyncio.wait_for(connection.request(frame_type, payload), self.timeout)
+        except asyncio.TimeoutError:
+            if connection is None:
+                self._retry_at = time.monotonic() + self.retry_seconds
+            raise # a slow reply only skips this request
+        except (OSError, EOFError, ProtocolError) as e: # EOFError covers IncompleteReadError
+            self._retry_at = time.monotonic() + self.retry_seconds
+            raise ConnectionError(f"Inference server {self.address} unreachable: {e}") from e
+        if reply_type == BUSY:
+            raise InferenceQueueFull(reply.decode("utf-8"))
+        if reply_type != RESULT:
+            raise ServerError(reply.decode("utf-8") if reply_type == ERROR else f"Unexpected frame type {reply_type}")
+        return reply
+
+    async def predict(self, text: str) -> Tuple[str, Dict[str, Any]]:
+        """Predict on the server; falls back to the local regex tier if it fails or times out."""
+        self.requests += 1
+        try:
+            intent, entities = load_json(await self._request(PREDICT, text.encode("utf-8")))
+            return intent, entities
+        except (ConnectionError, asyncio.TimeoutError, ServerError) as e:
+            self.fallbacks += 1
+            logger.warning(f"Remote inference failed, using the regex tier: {e or type(e).__name__}")
+            return predict(text, use_models=False)
+
+    async def status(self) -> Optional[Dict[str, Any]]:
+        """The server's model, cache and connection status, or None if it cannot be reached."""
+        try:
+            return load_json(await self._request(STATUS))
+        except (ConnectionError, asyncio.TimeoutError, ServerError) as e:
+            logger.warning(f"Could not read inference server status: {e or type(e).__name__}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": sum(1 for c in self._connections if not c.closed),
+            "requests": self.requests,
+            "fallbacks": self.fallbacks,
+            "in_flight": sum(len(c.pending) for c in self._connections)
+        }
+
+    def close(self) -> None:
+        for connection in self._connections:
+            connection.close()
+        self._connections = []
@@ -0,0 +1,84 @@
+"""Framing shared by inference_server.py and inference_client.py.
+
+Every frame is a 9-byte header followed by the payload:
+
+    uint32 payload length | uint8 frame type | uint32 request id    (network byte order)
+
+Requests carry UTF-8 text; results carry compact JSON. The request id is
+echoed in the reply, so a client can pipeline many requests over one
+connection and match replies that arrive out of order.
+"""
+import asyncio
+import json
+import os
+import stat
+import struct
+from typing import Any, Tuple
+
+HEADER = struct.Struct("!IBI")
+MAX_PAYLOAD_BYTES = 1 << 20
+
+# Request frame types
+PREDICT = 0x01
+STATUS = 0x02
+
+# Reply frame types
+RESULT = 0x81
+ERROR = 0x82
+BUSY = 0x83 # the server's inference queue is full
+
+class ProtocolError(Exception):
+    """The peer sent a malformed or oversized frame."""
+
+def encode_frame(frame_type: int, request_id: int, payload: bytes = b"") -> bytes:
+    if len(payload) > MAX_PAYLOAD_BYTES:
+        raise ProtocolError(f"Payload of {len(payload)} bytes exceeds {MAX_PAYLOAD_BYTES}")
+    return HEADER.pack(len(payload), frame_type, request_id) + payload
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, int, bytes]:
+    """Read one frame as (frame type, request id, payload); raises IncompleteReadError at EOF."""
+    length, frame_type, request_id = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if length > MAX_PAYLOAD_BYTES:
+        raise ProtocolError(f"Frame of {length} bytes exceeds {MAX_PAYLOAD_BYTES}")
+    return frame_type, request_id, await reader.readexactly(length)
+
+def dump_json(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+def load_json(payload: bytes) -> Any:
+    return json.loads(payload.decode("utf-8"))
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """'unix:/path/to.sock' -> ('unix', path); 'host:port' -> ('tcp', (host, port))."""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Inference address must be 'unix:/path' or 'host:port', got {address!r}")
+    return "tcp", (host, int(port))
+
+async def open_connection(address: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    kind, target = parse_address(address)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(target)
+    return await asyncio.open_connection(*target)
+
+async def _remove_stale_socket(path: str) -> None:
+    """Unlink a socket left behind by a server that did not shut down cleanly; refuse if one still answers."""
+    if not stat.S_ISSOCK(os.stat(path).st_mode):
+        raise OSError(f"{path} exists and is not a socket")
+    try:
+        _, writer = await asyncio.open_unix_connection(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+        return
+    writer.close()
+    raise OSError(f"Another inference server is already listening on {path}")
+
+async def start_server(handler, address: str) -> asyncio.AbstractServer:
+    kind, target = parse_address(address)
+    if kind == "unix":
+        if os.path.exists(target):
+            await _remove_stale_socket(target)
+        return await asyncio.start_unix_server(handler, target)
+    return await asyncio.start_server(handler, *target)
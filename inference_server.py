@@ -0,0 +1,126 @@
+"""Serve fmodel predictions to bot processes over a Unix socket or localhost TCP.
+
+Loading the transformer models takes several GB per process. Run this once
+per host and point every bot (or shard process) at it with INFERENCE_SERVER,
+so they all share one warm model and one inference pool:
+
+    python inference_server.py --listen unix:/tmp/fmodel.sock
+    python inference_server.py --listen 127.0.0.1:7878
+
+Requests on one connection are answered concurrently, in whatever order they
+finish; see inference_protocol.py for the framing.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+from typing import Any, Dict, Set
+
+from dotenv import load_dotenv
+
+# Load the environment before fmodel reads its config at import time
+load_dotenv(dotenv_path='C:/Users/Hrida/OneDrive/Documents/Desktop/Avni_College/foss_p/tesserx/data.env')
+
+import fmodel
+from inference_protocol import (
+    BUSY, ERROR, PREDICT, RESULT, STATUS, ProtocolError, dump_json, encode_frame, read_frame, start_server
+)
+
+logger = logging.getLogger("inference_server")
+
+INFERENCE_LISTEN = os.getenv("INFERENCE_LISTEN", "") or os.getenv("INFERENCE_SERVER", "") or "127.0.0.1:7878"
+
+class InferenceServer:
+    """Answers PREDICT and STATUS frames using this process's fmodel."""
+
+    def __init__(self):
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self.requests = 0
+        self.busy = 0
+        self.errors = 0
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "model": fmodel.get_model_status(),
+            "cache": fmodel.get_cache_stats(),
+            "batching": fmodel.get_batching_stats(),
+            "server": {"connections": len(self._writers), "requests": self.requests, "busy": self.busy,
+                       "errors": self.errors, "pid": os.getpid()}
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        write_lock = asyncio.Lock()
+        tasks: Set[asyncio.Task] = set()
+        try:
+            while True:
+                frame_type, request_id, payload = await read_frame(reader)
+                task = asyncio.create_task(self._answer(writer, write_lock, frame_type, request_id, payload))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass # client went away
+        except ProtocolError as e:
+            logger.warning(f"Dropping connection: {e}")
+        finally:
+            self._writers.discard(writer)
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    def close_connections(self) -> None:
+        """Disconnect every client so they fall back to their regex tier instead of waiting."""
+        for writer in list(self._writers):
+            writer.close()
+
+    async def _answer(self, writer: asyncio.StreamWriter, write_lock: asyncio.Lock,
+                      frame_type: int, request_id: int, payload: bytes) -> None:
+        self.requests += 1
+        try:
+            if frame_type == PREDICT:
+                intent, entities = await fmodel.predict_async(payload.decode("utf-8"))
+                reply = encode_frame(RESULT, request_id, dump_json([intent, entities]))
+            elif frame_type == STATUS:
+                reply = encode_frame(RESULT, request_id, dump_json(self.status()))
+            else:
+                reply = encode_frame(ERROR, request_id, f"Unknown frame type {frame_type}".encode("utf-8"))
+        except fmodel.InferenceQueueFull as e:
+            self.busy += 1
+            reply = encode_frame(BUSY, request_id, str(e).encode("utf-8"))
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Request {request_id} failed: {e}")
+            reply = encode_frame(ERROR, request_id, str(e).encode("utf-8"))
+        async with write_lock:
+            try:
+                writer.write(reply)
+                await writer.drain()
+            except ConnectionError:
+                pass # the client disconnected while we were predicting
+
+async def serve(address: str) -> None:
+    server = InferenceServer()
+    listener = await start_server(server.handle, address)
+    logger.info(f"Inference server listening on {address}")
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError: # Windows
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stopping.set))
+    async with listener:
+        try:
+            await stopping.wait()
+        finally:
+            logger.info("Inference server stopping...")
+            server.close_connections()
+    fmodel.shutdown_inference_executor()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve fmodel predictions over local IPC.")
+    parser.add_argument("--listen", default=INFERENCE_LISTEN, help="'unix:/path/to.sock' or 'host:port'")
+    args = parser.parse_args()
+    fmodel.start_model_loading() # the regex tier answers until the models are ready
+    asyncio.run(serve(args.listen))
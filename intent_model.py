@@ -0,0 +1,162 @@
+"""Small hashed n-gram intent classifier used as the middle tier of fmodel's cascade.
+
+Trained from fmodel.INTENT_DESCRIPTIONS plus labelled traffic logged by fmodel
+(INTENT_TRAFFIC_LOG, one JSON object per line).
+
+    python intent_model.py train --traffic intent_traffic.jsonl --out intent_model.npz
+    python intent_model.py predict "show all the teams"
+"""
+import argparse
+import hashlib
+import json
+import logging
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("intent_model")
+
+DEFAULT_N_FEATURES = 2 ** 16
+
+def hash_features(text: str, n_features: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Hash word unigrams, bigrams and in-word character trigrams into (indices, values)."""
+    words = text.split()
+    grams = ["w:" + w for w in words]
+    grams += ["b:" + a + " " + b for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"<{w}>"
+        grams += ["c:" + padded[i:i + 3] for i in range(len(padded) - 2)]
+
+    counts: Dict[int, float] = {}
+    for gram in grams:
+        index = zlib.crc32(gram.encode()) % n_features
+        counts[index] = counts.get(index, 0.0) + 1.0
+    if not counts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    return indices, values / np.linalg.norm(values)
+
+class HashedNgramIntentModel:
+    """Multinomial logistic regression over hashed n-gram features."""
+
+    def __init__(self, labels: List[str], n_features: int = DEFAULT_N_FEATURES,
+                 weights: Optional[np.ndarray] = None, bias: Optional[np.ndarray] = None):
+        self.labels = list(labels)
+        self.n_features = n_features
+        self.weights = weights if weights is not None else np.zeros((n_features, len(labels)), dtype=np.float32)
+        self.bias = bias if bias is not None else np.zeros(len(labels), dtype=np.float32)
+
+    @property
+    def version(self) -> str:
+        """Short content hash, used to invalidate cached predictions after retraining."""
+        digest = hashlib.sha256(json.dumps(self.labels).encode())
+        digest.update(self.weights.tobytes())
+        digest.update(self.bias.tobytes())
+        return digest.hexdigest()[:16]
+
+    def _probabilities(self, indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        logits = values @ self.weights[indices] + self.bias
+        logits -= logits.max()
+        exp = np.exp(logits)
+        return exp / exp.sum()
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Return the most likely intent and its probability."""
+        probabilities = self._probabilities(*hash_features(text, self.n_features))
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+    def fit(self, texts: List[str], intents: List[str], epochs: int = 30,
+            learning_rate: float = 0.5, l2: float = 1e-4, seed: int = 0) -> "HashedNgramIntentModel":
+        """Train with per-example SGD on the softmax cross-entropy loss."""
+        label_index = {label: i for i, label in enumerate(self.labels)}
+        examples = [hash_features(text, self.n_features) for text in texts]
+        targets = [label_index[intent] for intent in intents]
+        rng = np.random.default_rng(seed)
+        for epoch in range(epochs):
+            rate = learning_rate / (1.0 + epoch * 0.1)
+            for i in rng.permutation(len(examples)):
+                indices, values = examples[i]
+                gradient = self._probabilities(indices, values)
+                gradient[targets[i]] -= 1.0
+                self.weights[indices] -= rate * (np.outer(values, gradient) + l2 * self.weights[indices])
+                self.bias -= rate * gradient
+        return self
+
+    def save(self, path: str) -> None:
+        """Write the model to an .npz file."""
+        np.savez_compressed(path, weights=self.weights, bias=self.bias,
+                            labels=np.array(self.labels), n_features=np.array(self.n_features))
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNgramIntentModel":
+        """Read a model written by save()."""
+        with np.load(path) as data:
+            return cls([str(label) for label in data["labels"]], int(data["n_features"]),
+                       data["weights"], data["bias"])
+
+def load_training_data(traffic_paths: Iterable[str], min_confidence: float,
+                       tiers: Optional[List[str]]) -> Tuple[List[str], List[str]]:
+    """Combine INTENT_DESCRIPTIONS with labelled traffic lines above min_confidence."""
+    from fmodel import INTENT_DESCRIPTIONS, preprocess_text
+
+    texts, intents = [], []
+    for intent, phrases in INTENT_DESCRIPTIONS.items():
+        for phrase in phrases:
+            texts.append(preprocess_text(phrase))
+            intents.append(intent)
+
+    for path in traffic_paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("intent") in (None, "unknown") or record.get("confidence", 1.0) < min_confidence:
+                    continue
+                if tiers and record.get("tier") not in tiers:
+                    continue
+                texts.append(preprocess_text(record["text"]))
+                intents.append(record["intent"])
+    return texts, intents
+
+def train(traffic_paths: List[str], out_path: str, n_features: int, epochs: int,
+          min_confidence: float, tiers: Optional[List[str]]) -> HashedNgramIntentModel:
+    """Train a model from descriptions and traffic logs and save it to out_path."""
+    texts, intents = load_training_data(traffic_paths, min_confidence, tiers)
+    model = HashedNgramIntentModel(sorted(set(intents)), n_features).fit(texts, intents, epochs=epochs)
+    correct = sum(model.classify(text)[0] == intent for text, intent in zip(texts, intents))
+    logger.info(f"Trained on {len(texts)} examples over {len(model.labels)} intents "
+                f"(training accuracy {correct / len(texts):.1%})")
+    model.save(out_path)
+    logger.info(f"Saved intent model {model.version} to {out_path}")
+    return model
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Train or query the hashed n-gram intent model.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="retrain the model and save it")
+    train_parser.add_argument("--traffic", nargs="*", default=[], help="labelled traffic JSONL files")
+    train_parser.add_argument("--out", default="intent_model.npz")
+    train_parser.add_argument("--features", type=int, default=DEFAULT_N_FEATURES)
+    train_parser.add_argument("--epochs", type=int, default=30)
+    train_parser.add_argument("--min-confidence", type=float, default=0.9,
+                              help="ignore logged predictions below this confidence")
+    train_parser.add_argument("--tiers", nargs="*", default=["regex"],
+                              help="only learn from traffic labelled by these tiers (empty for all)")
+
+    predict_parser = commands.add_parser("predict", help="classify text with a saved model")
+    predict_parser.add_argument("text")
+    predict_parser.add_argument("--model", default="intent_model.npz")
+
+    args = parser.parse_args()
+    if args.command == "train":
+        train(args.traffic, args.out, args.features, args.epochs, args.min_confidence, args.tiers)
+    else:
+        from fmodel import preprocess_text
+        intent, confidence = HashedNgramIntentModel.load(args.model).classify(preprocess_text(args.text))
+        print(f"{intent} ({confidence:.2f})")
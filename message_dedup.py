@@ -0,0 +1,44 @@
+"""Bounded record of recently handled message ids, for skipping gateway replays."""
+import os
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+MESSAGE_DEDUP_CAPACITY = int(os.getenv("MESSAGE_DEDUP_CAPACITY", "10000"))
+MESSAGE_DEDUP_WINDOW_SECONDS = float(os.getenv("MESSAGE_DEDUP_WINDOW_SECONDS", "900")) # 0 keeps ids until evicted
+
+class RecentMessages:
+    """Insertion-ordered set with O(1) lookup, insert and oldest-first eviction."""
+
+    def __init__(self, capacity: int = MESSAGE_DEDUP_CAPACITY, window: float = MESSAGE_DEDUP_WINDOW_SECONDS):
+        self.capacity = capacity
+        self.window = window
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, key: Hashable) -> bool:
+        seen_at = self._seen.get(key)
+        return seen_at is not None and not self._expired(seen_at, time.monotonic())
+
+    def _expired(self, seen_at: float, now: float) -> bool:
+        return self.window > 0 and now - seen_at > self.window
+
+    def check_and_add(self, key: Hashable) -> bool:
+        """Return True if key was already seen; otherwise remember it and return False."""
+        now = time.monotonic()
+        seen_at = self._seen.get(key)
+        if seen_at is not None:
+            if not self._expired(seen_at, now):
+                return True
+            del self._seen[key]
+        self._seen[key] = now
+
+        # Entries are in arrival order, so expired and surplus ones are all at the front
+        if self.window > 0:
+            while self._expired(next(iter(self._seen.values())), now):
+                self._seen.popitem(last=False)
+        while len(self._seen) > self.capacity:
+            self._seen.popitem(last=False)
+        return False
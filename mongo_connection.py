@@ -0,0 +1,267 @@
+"""Managed MongoDB client: configured pooling and timeouts, a health probe, a
+circuit breaker and per-operation metrics.
+
+Every repository call goes through CircuitBreaker.call. Connection errors,
+timeouts and operations slower than MONGO_SLOW_OP_MS count as failures; after
+MONGO_BREAKER_FAILURES in a row the breaker opens and calls fail fast with
+DatabaseUnavailable for MONGO_BREAKER_RESET_SECONDS, then a single trial call
+decides whether it closes again.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from pymongo import MongoClient, monitoring
+from pymongo.errors import AutoReconnect, ConnectionFailure, ExecutionTimeout, PyMongoError, WaitQueueTimeoutError
+
+logger = logging.getLogger("mongo_connection")
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+MONGODB_DB = os.getenv("MONGODB_DB", "discord_bot")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "2"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "3000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "3000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+MONGO_SLOW_OP_MS = float(os.getenv("MONGO_SLOW_OP_MS", "2000"))
+MONGO_BREAKER_FAILURES = int(os.getenv("MONGO_BREAKER_FAILURES", "5"))
+MONGO_BREAKER_RESET_SECONDS = float(os.getenv("MONGO_BREAKER_RESET_SECONDS", "30"))
+
+# Errors that say "the database is unreachable or too slow", as opposed to a bad query
+UNAVAILABLE_ERRORS = (ConnectionFailure, AutoReconnect, ExecutionTimeout, WaitQueueTimeoutError)
+
+class DatabaseUnavailable(Exception):
+    """MongoDB is unreachable, too slow, or the circuit breaker is open."""
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker around blocking database calls (thread-safe)."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold: int = MONGO_BREAKER_FAILURES,
+                 reset_timeout: float = MONGO_BREAKER_RESET_SECONDS, slow_call_ms: float = MONGO_SLOW_OP_MS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_ms = slow_call_ms
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self.trips = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise DatabaseUnavailable("database circuit breaker is open")
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    self.rejected += 1
+                    raise DatabaseUnavailable("database is recovering; trial request in progress")
+                self._trial_running = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Database circuit breaker closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def _release_trial(self) -> None:
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self, reason: str) -> None:
+        with self._lock:
+            self._trial_running = False
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.trips += 1
+                logger.error(f"Database circuit breaker opened after {self.failures} failure(s): {reason}")
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func unless the breaker is open; connection errors become DatabaseUnavailable."""
+        return self._call(func, args, kwargs, self.slow_call_ms)
+
+    def call_unbounded(self, func: Callable, *args, **kwargs) -> Any:
+        """Like call, for bulk jobs whose duration says nothing about database health."""
+        return self._call(func, args, kwargs, float("inf"))
+
+    def _call(self, func: Callable, args, kwargs, slow_call_ms: float) -> Any:
+        self._before_call()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except UNAVAILABLE_ERRORS as e:
+            self.record_failure(f"{type(e).__name__}: {e}")
+            raise DatabaseUnavailable(str(e)) from e
+        except Exception:
+            self.record_success()  # the server answered; the request itself was bad
+            raise
+        except BaseException:
+            self._release_trial()  # cancelled or interrupted: says nothing about the server
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms > slow_call_ms:
+            self.record_failure(f"slow call ({elapsed_ms:.0f} ms)")
+        else:
+            self.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips, "rejected": self.rejected}
+
+class _OperationStats:
+    __slots__ = ("count", "failures", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms: float, failed: bool = False) -> None:
+        self.count += 1
+        self.failures += failed
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "avg_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms
+        }
+
+class MongoMetrics(monitoring.CommandListener, monitoring.ConnectionPoolListener):
+    """Per-command latency and connection pool wait times, from pymongo's event hooks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.commands: Dict[str, _OperationStats] = {}
+        self.pool_wait = _OperationStats()
+        self.pool_timeouts = 0
+        self.connections_open = 0
+        self.connections_in_use = 0
+
+    def _command(self, event, failed: bool) -> None:
+        with self._lock:
+            stats = self.commands.setdefault(event.command_name, _OperationStats())
+            stats.add(event.duration_micros / 1000, failed)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._command(event, failed=False)
+
+    def failed(self, event):
+        self._command(event, failed=True)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.pool_wait.add(event.duration * 1000)
+            self.connections_in_use += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.pool_wait.add(event.duration * 1000, failed=True)
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                self.pool_timeouts += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.connections_in_use -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "commands": {name: stats.as_dict() for name, stats in sorted(self.commands.items())},
+                "pool_wait": self.pool_wait.as_dict(),
+                "pool_timeouts": self.pool_timeouts,
+                "connections_open": self.connections_open,
+                "connections_in_use": self.connections_in_use
+            }
+
+class MongoConnection:
+    """One pooled MongoClient for the process, with its breaker and metrics."""
+
+    def __init__(self, uri: str = MONGODB_URI, db_name: str = MONGODB_DB, client_factory: Callable = MongoClient):
+        self.metrics = MongoMetrics()
+        self.breaker = CircuitBreaker()
+        self.client = client_factory(
+            uri,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            retryWrites=True,
+            appname="tesserx-bot",
+            event_listeners=[self.metrics]
+        )
+        self.db = self.client[db_name]
+        self.healthy: Optional[bool] = None
+
+    def ping(self) -> float:
+        """Round-trip a ping through the breaker; returns the latency in ms."""
+        start = time.perf_counter()
+        self.breaker.call(self.client.admin.command, "ping")
+        return (time.perf_counter() - start) * 1000
+
+    async def probe(self) -> bool:
+        """Startup health check; logs the outcome instead of raising."""
+        loop = asyncio.get_running_loop()
+        try:
+            latency = await loop.run_in_executor(None, self.ping)
+            self.healthy = True
+            logger.info(f"✅ MongoDB reachable (ping {latency:.0f} ms)")
+        except (DatabaseUnavailable, PyMongoError) as e:
+            self.healthy = False
+            logger.error(f"❌ MongoDB is unreachable, team commands will fail fast until it recovers: {e}")
+        return self.healthy
+
+    def stats(self) -> Dict[str, Any]:
+        return {"breaker": self.breaker.stats(), **self.metrics.stats()}
+
+    def close(self) -> None:
+        self.client.close()
@@ -0,0 +1,124 @@
+"""ONNX Runtime backend for the fmodel zero-shot classifier and NER pipelines.
+
+Select it with MODEL_BACKEND=onnx (fp32) or MODEL_BACKEND=onnx-int8 (dynamic int8
+quantization). Models are exported on first use and cached under ONNX_MODEL_DIR.
+
+    python onnx_backend.py --export [--int8]   # export (and quantize) ahead of deploy
+    python onnx_backend.py --parity [--int8]   # compare against the PyTorch pipelines
+"""
+import argparse
+import logging
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger("onnx_backend")
+
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx_models")
+QUANTIZED_FILE_NAME = "model_quantized.onnx"
+
+def _model_dir(model_id: str, quantize: bool) -> str:
+    name = model_id.replace("/", "--") + ("-int8" if quantize else "")
+    return os.path.join(ONNX_MODEL_DIR, name)
+
+def export_model(model_id: str, model_cls, quantize: bool = False) -> str:
+    """Export model_id to ONNX (and optionally quantize it), returning the model directory."""
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    fp32_dir = _model_dir(model_id, quantize=False)
+    if not os.path.exists(os.path.join(fp32_dir, "model.onnx")):
+        logger.info(f"Exporting {model_id} to ONNX in {fp32_dir}")
+        model_cls.from_pretrained(model_id, export=True).save_pretrained(fp32_dir)
+        AutoTokenizer.from_pretrained(model_id).save_pretrained(fp32_dir)
+    if not quantize:
+        return fp32_dir
+
+    int8_dir = _model_dir(model_id, quantize=True)
+    if not os.path.exists(os.path.join(int8_dir, QUANTIZED_FILE_NAME)):
+        logger.info(f"Quantizing {model_id} to int8 in {int8_dir}")
+        quantizer = ORTQuantizer.from_pretrained(fp32_dir)
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=int8_dir, quantization_config=qconfig)
+        AutoTokenizer.from_pretrained(fp32_dir).save_pretrained(int8_dir)
+    return int8_dir
+
+def load_onnx_pipelines(quantize: bool = False) -> Tuple[Any, Any]:
+    """Build the zero-shot and NER pipelines on ONNX Runtime (CPU)."""
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTModelForTokenClassification
+    from transformers import AutoTokenizer, pipeline
+    from fmodel import NER_MODEL, ZERO_SHOT_MODEL
+
+    file_name = QUANTIZED_FILE_NAME if quantize else "model.onnx"
+    pipelines = []
+    for task, model_id, model_cls, kwargs in (
+        ("zero-shot-classification", ZERO_SHOT_MODEL, ORTModelForSequenceClassification, {}),
+        ("ner", NER_MODEL, ORTModelForTokenClassification, {"grouped_entities": True}),
+    ):
+        model_dir = export_model(model_id, model_cls, quantize)
+        model = model_cls.from_pretrained(model_dir, file_name=file_name, provider="CPUExecutionProvider")
+        pipelines.append(pipeline(task, model=model, tokenizer=AutoTokenizer.from_pretrained(model_dir), **kwargs))
+    return pipelines[0], pipelines[1]
+
+def check_parity(quantize: bool, tolerance: float, min_agreement: float) -> bool:
+    """Run fmodel.TEST_COMMANDS through both backends and report any divergence."""
+    from transformers import pipeline
+    from fmodel import (HYPOTHESIS_TEMPLATE, INTENTS_LIST, NER_MODEL, TEST_COMMANDS,
+                        ZERO_SHOT_MODEL, preprocess_text)
+
+    torch_classifier = pipeline("zero-shot-classification", model=ZERO_SHOT_MODEL)
+    torch_ner = pipeline("ner", model=NER_MODEL, grouped_entities=True)
+    onnx_classifier, onnx_ner = load_onnx_pipelines(quantize)
+
+    label_matches = 0
+    entity_matches = 0
+    max_delta = 0.0
+    for command in TEST_COMMANDS:
+        text = preprocess_text(command)
+        expected = torch_classifier(text, candidate_labels=INTENTS_LIST, hypothesis_template=HYPOTHESIS_TEMPLATE)
+        actual = onnx_classifier(text, candidate_labels=INTENTS_LIST, hypothesis_template=HYPOTHESIS_TEMPLATE)
+        expected_scores: Dict[str, float] = dict(zip(expected["labels"], expected["scores"]))
+        delta = max(abs(expected_scores[label] - score) for label, score in zip(actual["labels"], actual["scores"]))
+        max_delta = max(max_delta, delta)
+        same_label = expected["labels"][0] == actual["labels"][0]
+        label_matches += same_label
+
+        expected_entities = _entity_set(torch_ner(text))
+        actual_entities = _entity_set(onnx_ner(text))
+        entity_matches += expected_entities == actual_entities
+
+        status = "ok" if same_label and expected_entities == actual_entities else "DIFF"
+        print(f"[{status}] '{command}': {expected['labels'][0]} -> {actual['labels'][0]} "
+              f"(max score delta {delta:.4f}), entities {sorted(expected_entities)} -> {sorted(actual_entities)}")
+
+    total = len(TEST_COMMANDS)
+    label_agreement = label_matches / total
+    entity_agreement = entity_matches / total
+    print(f"Top-1 intent agreement: {label_agreement:.0%}, entity agreement: {entity_agreement:.0%}, max score delta: {max_delta:.4f}")
+    passed = label_agreement >= min_agreement and entity_agreement >= min_agreement
+    if not quantize:
+        passed = passed and max_delta <= tolerance
+    return passed
+
+def _entity_set(results: List[Dict]) -> set:
+    return {(ent["entity_group"], ent["word"].strip()) for ent in results}
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Export fmodel pipelines to ONNX and check parity with PyTorch.")
+    parser.add_argument("--export", action="store_true", help="export (and with --int8, quantize) the models")
+    parser.add_argument("--parity", action="store_true", help="compare ONNX outputs with the PyTorch pipelines")
+    parser.add_argument("--int8", action="store_true", help="use the dynamic int8 quantized models")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="max zero-shot score delta for fp32")
+    parser.add_argument("--min-agreement", type=float, default=None,
+                        help="required top-1 intent/entity agreement (default 1.0 fp32, 0.9 int8)")
+    args = parser.parse_args()
+
+    if args.export:
+        load_onnx_pipelines(quantize=args.int8)
+    if args.parity:
+        min_agreement = args.min_agreement if args.min_agreement is not None else (0.9 if args.int8 else 1.0)
+        sys.exit(0 if check_parity(args.int8, args.tolerance, min_agreement) else 1)
+    if not (args.export or args.parity):
+        parser.print_help()
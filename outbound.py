@@ -0,0 +1,202 @@
+"""Outbound message dispatcher: per-channel queues, coalescing and rate budgets.
+
+Handlers queue messages with `await outbound.send(channel, ...)` instead of
+calling channel.send directly. Each channel drains its own queue and merges
+consecutive messages queued within OUTBOUND_COALESCE_MS into one Discord
+message (text joined by newlines, embeds stacked), as long as the result stays
+within Discord's message limits and reading order is preserved.
+
+Sends are budgeted with token buckets before they reach discord.py: one per
+channel (Discord allows about 5 messages per 5 seconds per channel) and one
+shared by the process. The shared bucket is FIFO, so a hot channel waits on
+its own bucket and cannot starve quieter channels. When the bot runs as
+several shard processes, give each one a share of the global budget.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+import discord
+
+logger = logging.getLogger("outbound")
+
+OUTBOUND_COALESCE_MS = float(os.getenv("OUTBOUND_COALESCE_MS", "75"))
+OUTBOUND_CHANNEL_BURST = int(os.getenv("OUTBOUND_CHANNEL_BURST", "5"))
+OUTBOUND_CHANNEL_PER_SECOND = float(os.getenv("OUTBOUND_CHANNEL_PER_SECOND", "1"))
+OUTBOUND_GLOBAL_BURST = int(os.getenv("OUTBOUND_GLOBAL_BURST", "40"))
+OUTBOUND_GLOBAL_PER_SECOND = float(os.getenv("OUTBOUND_GLOBAL_PER_SECOND", "40"))
+
+MAX_CONTENT_LENGTH = 2000
+MAX_EMBEDS = 10
+MAX_EMBED_CHARACTERS = 6000 # total over every embed in one message
+MAX_FILES = 10
+
+class TokenBucket:
+    """Async token bucket; waiters are served in arrival order."""
+
+    def __init__(self, capacity: int, per_second: float):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.per_second)
+                self._refill()
+            self.tokens -= 1
+
+class _Outgoing:
+    __slots__ = ("content", "embeds", "files", "view", "future")
+
+    def __init__(self, content: Optional[str], embeds: List[discord.Embed], files: List[discord.File],
+                 view: Optional[discord.ui.View], future: asyncio.Future):
+        self.content = content
+        self.embeds = embeds
+        self.files = files
+        self.view = view
+        self.future = future
+
+class _Batch:
+    """Messages being merged into one send."""
+
+    def __init__(self, first: _Outgoing):
+        self.lines = [first.content] if first.content else []
+        self.length = len(first.content or "")
+        self.embeds = list(first.embeds)
+        self.embed_characters = sum(len(embed) for embed in first.embeds)
+        self.files = list(first.files)
+        self.view = first.view
+        self.futures = [first.future]
+
+    def try_add(self, item: _Outgoing) -> bool:
+        content_length = self.length + (len(item.content) + 1 if item.content else 0)
+        embed_characters = self.embed_characters + sum(len(embed) for embed in item.embeds)
+        if (content_length > MAX_CONTENT_LENGTH
+                or len(self.embeds) + len(item.embeds) > MAX_EMBEDS
+                or embed_characters > MAX_EMBED_CHARACTERS
+                or len(self.files) + len(item.files) > MAX_FILES
+                or (self.view is not None and item.view is not None)
+                # Views edit their message's embeds in place, which would overwrite the other embeds
+                or (self.view is not None and item.embeds)
+                or (item.view is not None and self.embeds)
+                or (item.content and self.embeds)): # text after an embed would render above it
+            return False
+        if item.content:
+            self.lines.append(item.content)
+            self.length = content_length
+        self.embeds.extend(item.embeds)
+        self.embed_characters = embed_characters
+        self.files.extend(item.files)
+        self.view = self.view or item.view
+        self.futures.append(item.future)
+        return True
+
+    def send_kwargs(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {}
+        if self.lines:
+            kwargs["content"] = "\n".join(self.lines)
+        if self.embeds:
+            kwargs["embeds"] = self.embeds
+        if self.files:
+            kwargs["files"] = self.files
+        if self.view is not None:
+            kwargs["view"] = self.view
+        return kwargs
+
+class OutboundDispatcher:
+    """Per-channel outbound queues with coalescing and rate-limit budgets."""
+
+    def __init__(self, coalesce_ms: float = OUTBOUND_COALESCE_MS):
+        self.coalesce_seconds = coalesce_ms / 1000
+        self._queues: Dict[int, Deque[_Outgoing]] = {}
+        self._channels: Dict[int, Any] = {}
+        self._buckets: Dict[int, TokenBucket] = {}
+        # Channels whose worker exited, by when; their buckets are dropped once they must have refilled
+        self._idle_since: "OrderedDict[int, float]" = OrderedDict()
+        self.refill_seconds = OUTBOUND_CHANNEL_BURST / OUTBOUND_CHANNEL_PER_SECOND
+        self._workers: Dict[int, asyncio.Task] = {}
+        self.global_bucket = TokenBucket(OUTBOUND_GLOBAL_BURST, OUTBOUND_GLOBAL_PER_SECOND)
+
+    async def send(self, channel, content: Optional[str] = None, *, embed: Optional[discord.Embed] = None,
+                   file: Optional[discord.File] = None, view: Optional[discord.ui.View] = None,
+                   wait: bool = False) -> Optional[discord.Message]:
+        """Queue a message for channel; with wait=True, return the (possibly merged) sent message."""
+        future = asyncio.get_running_loop().create_future()
+        item = _Outgoing(
+            str(content) if content is not None else None,
+            [embed] if embed is not None else [],
+            [file] if file is not None else [],
+            view,
+            future
+        )
+        queue = self._queues.setdefault(channel.id, deque())
+        queue.append(item)
+        self._channels[channel.id] = channel
+        if channel.id not in self._workers:
+            self._idle_since.pop(channel.id, None)
+            self._workers[channel.id] = asyncio.create_task(self._drain(channel.id))
+        return await future if wait else None
+
+    async def flush(self, timeout: float) -> None:
+        """Wait up to timeout seconds for every queued message to be sent (used at shutdown)."""
+        workers = list(self._workers.values())
+        if workers:
+            await asyncio.wait(workers, timeout=timeout)
+
+    async def _drain(self, channel_id: int) -> None:
+        queue = self._queues[channel_id]
+        bucket = self._buckets.setdefault(channel_id, TokenBucket(OUTBOUND_CHANNEL_BURST, OUTBOUND_CHANNEL_PER_SECOND))
+        try:
+            while queue:
+                # Let back-to-back sends from the same handler arrive before building the batch
+                await asyncio.sleep(self.coalesce_seconds)
+                await bucket.acquire()
+                await self.global_bucket.acquire()
+                batch = _Batch(queue.popleft())
+                while queue and batch.try_add(queue[0]):
+                    queue.popleft()
+                await self._deliver(self._channels[channel_id], batch)
+        except asyncio.CancelledError:
+            while queue:
+                future = queue.popleft().future
+                if not future.done():
+                    future.set_result(None)
+            raise
+        finally:
+            del self._workers[channel_id]
+            del self._queues[channel_id]
+            del self._channels[channel_id]
+            self._idle_since[channel_id] = time.monotonic()
+            self._drop_refilled_buckets()
+
+    def _drop_refilled_buckets(self) -> None:
+        # A full bucket is the same as a new one, so idle channels don't need to keep theirs
+        cutoff = time.monotonic() - self.refill_seconds
+        while self._idle_since:
+            channel_id, idle_since = next(iter(self._idle_since.items()))
+            if idle_since > cutoff:
+                break
+            del self._idle_since[channel_id]
+            del self._buckets[channel_id]
+
+    async def _deliver(self, channel, batch: _Batch) -> None:
+        try:
+            message = await channel.send(**batch.send_kwargs())
+        except Exception as e:
+            logger.error(f"Failed to send to channel {channel.id}: {e}")
+            message = None
+        for future in batch.futures:
+            if not future.done():
+                future.set_result(message)
@@ -0,0 +1,120 @@
+"""Run the bot as several shard processes and restart any that crash.
+
+Each child runs fbot.py with SHARD_COUNT and its own SHARD_IDS, so every
+process opens gateway connections for its shards only and shares MongoDB
+with the others.
+
+    python shard_launcher.py --shards 4 --per-process 2   # 2 processes x 2 shards
+    python shard_launcher.py --shards auto                # Discord's recommended count
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import time
+import urllib.request
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger("shard_launcher")
+
+RESTART_BACKOFF_INITIAL = float(os.getenv("SHARD_RESTART_BACKOFF_INITIAL", "5"))
+RESTART_BACKOFF_MAX = float(os.getenv("SHARD_RESTART_BACKOFF_MAX", "300"))
+STABLE_AFTER_SECONDS = float(os.getenv("SHARD_STABLE_AFTER_SECONDS", "600")) # uptime that resets the backoff
+
+def recommended_shard_count(token: str) -> int:
+    """Ask Discord how many shards this bot should run."""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "DiscordBot (shard_launcher, 1.0)"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return int(json.load(response)["shards"])
+
+def plan_processes(shard_count: int, per_process: int) -> List[List[int]]:
+    """Split shard ids 0..shard_count-1 into consecutive groups of per_process."""
+    return [list(range(start, min(start + per_process, shard_count))) for start in range(0, shard_count, per_process)]
+
+class ShardProcess:
+    """One child bot process and its restart state."""
+
+    def __init__(self, shard_ids: List[int], shard_count: int, script: str):
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.script = script
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.restarts = 0
+        self.backoff = RESTART_BACKOFF_INITIAL
+
+    @property
+    def name(self) -> str:
+        return f"shards {','.join(map(str, self.shard_ids))}/{self.shard_count}"
+
+    async def start(self) -> None:
+        env = {**os.environ, "SHARD_COUNT": str(self.shard_count), "SHARD_IDS": ",".join(map(str, self.shard_ids))}
+        self.process = await asyncio.create_subprocess_exec(sys.executable, self.script, env=env)
+        logger.info(f"Started {self.name} (pid {self.process.pid})")
+
+    async def supervise(self, stopping: asyncio.Event) -> None:
+        """Keep the process running until stopping is set, backing off between crashes."""
+        while not stopping.is_set():
+            started_at = time.monotonic()
+            await self.start()
+            code = await self.process.wait()
+            if stopping.is_set():
+                break
+            uptime = time.monotonic() - started_at
+            if uptime >= STABLE_AFTER_SECONDS:
+                self.backoff = RESTART_BACKOFF_INITIAL
+            self.restarts += 1
+            logger.error(f"{self.name} exited with code {code} after {uptime:.0f}s; "
+                         f"restart #{self.restarts} in {self.backoff:.1f}s")
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=self.backoff)
+            except asyncio.TimeoutError:
+                pass
+            self.backoff = min(self.backoff * 2, RESTART_BACKOFF_MAX)
+
+    def terminate(self) -> None:
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+
+async def run(shard_count: int, per_process: int, script: str) -> None:
+    children = [ShardProcess(ids, shard_count, script) for ids in plan_processes(shard_count, per_process)]
+    logger.info(f"Launching {shard_count} shard(s) in {len(children)} process(es)")
+    stopping = asyncio.Event()
+
+    def stop() -> None:
+        logger.info("Stopping shard processes...")
+        stopping.set()
+        for child in children:
+            child.terminate()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop)
+        except NotImplementedError: # Windows
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop))
+    await asyncio.gather(*(child.supervise(stopping) for child in children))
+
+if __name__ == '__main__':
+    load_dotenv(dotenv_path='C:/Users/Hrida/OneDrive/Documents/Desktop/Avni_College/foss_p/tesserx/data.env')
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Run and supervise sharded bot processes.")
+    parser.add_argument("--shards", default=os.getenv("SHARD_COUNT") or "auto",
+                        help="total shard count, or 'auto' for Discord's recommendation")
+    parser.add_argument("--per-process", type=int, default=int(os.getenv("SHARDS_PER_PROCESS", "1")))
+    parser.add_argument("--script", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "fbot.py"))
+    args = parser.parse_args()
+
+    if args.shards == "auto":
+        shard_count = recommended_shard_count(os.environ["DISCORD_BOT_TOKEN"])
+        logger.info(f"Discord recommends {shard_count} shard(s)")
+    else:
+        shard_count = int(args.shards)
+    asyncio.run(run(shard_count, max(1, args.per_process), args.script))
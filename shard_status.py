@@ -0,0 +1,58 @@
+"""Per-shard health reports shared through MongoDB.
+
+Every bot process periodically upserts one document per shard it runs into
+the shard_status collection, so `!shards` in any process
+can show latency and guild counts for the whole deployment.
+"""
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+SHARD_COUNT = int(os.getenv("SHARD_COUNT") or 0) or None # None lets Discord pick
+SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS", "").split(",") if i.strip()] or None
+SHARD_STATUS_INTERVAL_SECONDS = float(os.getenv("SHARD_STATUS_INTERVAL_SECONDS", "30"))
+SHARD_STATUS_STALE_SECONDS = 3 * SHARD_STATUS_INTERVAL_SECONDS
+SHARD_STATUS_EXPIRE_SECONDS = int(os.getenv("SHARD_STATUS_EXPIRE_SECONDS", "3600")) # TTL for rows no process updates any more
+
+def collect(client) -> List[Dict[str, Any]]:
+    """Latency and guild count for each shard this process runs."""
+    guild_counts: Dict[int, int] = {}
+    for guild in client.guilds:
+        guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+    rows = []
+    for shard_id, latency in client.latencies:
+        shard = client.get_shard(shard_id)
+        rows.append({
+            "_id": shard_id,
+            "shard_count": client.shard_count,
+            "latency_ms": round(latency * 1000, 1) if latency == latency else None, # NaN before the first heartbeat
+            "guilds": guild_counts.get(shard_id, 0),
+            "connected": shard is not None and not shard.is_closed(),
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "updated_at": datetime.utcnow()
+        })
+    return rows
+
+def ensure_indexes(collection) -> None:
+    """Expire rows of shards that no longer exist, e.g. after scaling down."""
+    collection.create_index("updated_at", name="updated_at_ttl", expireAfterSeconds=SHARD_STATUS_EXPIRE_SECONDS)
+
+def publish(collection, rows: List[Dict[str, Any]]) -> None:
+    """Upsert this process's shard rows."""
+    for row in rows:
+        collection.replace_one({"_id": row["_id"]}, row, upsert=True)
+
+def read_all(collection, stale_after: float = SHARD_STATUS_STALE_SECONDS) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Every shard's latest row (marking stale ones) and the expected shard count."""
+    rows = list(collection.find().sort("_id", 1))
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+    for row in rows:
+        row["stale"] = row["updated_at"] < cutoff
+    # Take the count from live rows only, so leftovers of a larger earlier deployment don't inflate it
+    fresh = [row for row in rows if not row["stale"]] or rows
+    shard_count = max((row.get("shard_count") or 0 for row in fresh), default=0) or None
+    if shard_count:
+        rows = [row for row in rows if row["_id"] < shard_count]
+    return rows, shard_count
@@ -0,0 +1,132 @@
+"""In-process team directory that serves team reads from memory.
+
+The directory is loaded once on startup and kept coherent by:
+  * local writes: TeamRepository notifies it after every successful write;
+  * other bot processes: a MongoDB change stream when the deployment supports
+    one (replica set / Atlas), otherwise a periodic full reload.
+"""
+import asyncio
+import copy
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from team_repository import TeamRepository, team_key
+
+logger = logging.getLogger("team_directory")
+
+TEAM_DIRECTORY_POLL_SECONDS = float(os.getenv("TEAM_DIRECTORY_POLL_SECONDS", "30"))
+
+class TeamDirectory:
+    """Write-through, in-memory map of team_key -> team document (with members)."""
+
+    def __init__(self, repository: TeamRepository, poll_interval: float = TEAM_DIRECTORY_POLL_SECONDS):
+        self.repository = repository
+        self.poll_interval = poll_interval
+        self._teams: Dict[str, Dict[str, Any]] = {}
+        self._owners: Dict[Any, str] = {}  # team/membership _id -> team_key, to resolve delete events
+        self._sync_task: Optional[asyncio.Task] = None
+        self.ready = False
+        repository.add_write_listener(self.refresh_team)
+
+    async def start(self) -> None:
+        """Load every team and start following changes (idempotent)."""
+        if self._sync_task is None:
+            # Open the stream before loading, so writes made during the load are replayed afterwards
+            stream = None
+            try:
+                stream = await self.repository.watch_changes()
+            except Exception as e:
+                logger.warning(f"Change stream unavailable ({e}); polling every {self.poll_interval:.0f}s instead")
+            try:
+                await self.reload()
+            except Exception:
+                if stream is not None:
+                    stream.close()
+                raise
+            logger.info(f"Team directory loaded with {len(self._teams)} team(s)")
+            self._sync_task = asyncio.create_task(self._sync(stream))
+
+    async def stop(self) -> None:
+        """Stop following changes."""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+
+    async def reload(self) -> None:
+        """Replace the directory with a fresh copy of the database."""
+        teams, owners = await self.repository.load_directory()
+        self._teams = teams
+        self._owners = owners
+        self.ready = True
+
+    def get(self, team_name: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the team document, or None."""
+        doc = self._teams.get(team_key(team_name))
+        return copy.deepcopy(doc) if doc is not None else None
+
+    async def refresh_team(self, key: str) -> None:
+        """Re-read one team from the database after it changed."""
+        doc = await self.repository.find_team(key)
+        if doc is None:
+            self._teams.pop(key, None)
+        else:
+            self._teams[key] = doc
+            self._owners[doc["_id"]] = key
+
+    async def _sync(self, stream) -> None:
+        if stream is not None:
+            try:
+                await self._follow_change_stream(stream)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Change stream stopped ({e}); polling every {self.poll_interval:.0f}s instead")
+            # Changes may have been missed since the stream stopped, so reload straight away
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Team directory reload failed: {e}")
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Team directory reload failed: {e}")
+
+    async def _follow_change_stream(self, stream) -> None:
+        loop = asyncio.get_running_loop()
+        changes: asyncio.Queue = asyncio.Queue()
+
+        def pump():
+            try:
+                for change in stream:
+                    loop.call_soon_threadsafe(changes.put_nowait, change)
+            except Exception as e:
+                loop.call_soon_threadsafe(changes.put_nowait, e)
+            else: # e.g. an invalidate event (collection dropped or renamed)
+                loop.call_soon_threadsafe(changes.put_nowait, RuntimeError("change stream ended"))
+
+        # The blocking cursor gets its own thread so it never holds a query-pool worker
+        loop.run_in_executor(None, pump)
+        try:
+            while True:
+                change = await changes.get()
+                if isinstance(change, Exception):
+                    raise change
+                await self._apply_change(change)
+        finally:
+            stream.close()
+
+    async def _apply_change(self, change: Dict[str, Any]) -> None:
+        document = change.get("fullDocument") or {}
+        doc_id = change.get("documentKey", {}).get("_id")
+        key = document.get("team_key") or self._owners.get(doc_id)
+        if key is None:
+            await self.reload()  # a delete we cannot attribute; resync everything
+            return
+        if change.get("operationType") == "delete":
+            self._owners.pop(doc_id, None)
+        elif doc_id is not None:
+            self._owners[doc_id] = key
+        await self.refresh_team(key)
@@ -0,0 +1,264 @@
+"""Bulk import and export of teams and memberships.
+
+Files are CSV (team_name, role, status, repo, members; members separated by
+";") or JSON (an array of team objects, or one object per line). Imports
+upsert by team_key through bulk_write, so re-running a file is safe; exports
+stream both collections in team_key order through batched cursors.
+
+    python team_io.py import cohort.csv [--ordered]
+    python team_io.py export teams.json
+"""
+import csv
+import io
+import json
+import logging
+import os
+from datetime import datetime
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from team_repository import TEAM_FIELDS, _membership, ensure_indexes, member_key, team_key
+
+logger = logging.getLogger("team_io")
+
+TEAM_IO_BATCH_SIZE = int(os.getenv("TEAM_IO_BATCH_SIZE", "500"))
+CSV_COLUMNS = ["team_name", *TEAM_FIELDS, "members"]
+CSV_MEMBER_SEPARATOR = ";"
+FORMATS = ("csv", "json")
+
+class RowError(NamedTuple):
+    row: int
+    team_name: Optional[str]
+    message: str
+
+class ImportReport(NamedTuple):
+    rows: int
+    teams_created: int
+    teams_updated: int
+    memberships_created: int
+    errors: List[RowError]
+    team_keys: List[str]
+
+def detect_format(filename: str) -> str:
+    """Pick csv or json from a file name."""
+    extension = os.path.splitext(filename)[1].lower().lstrip(".")
+    if extension in ("json", "jsonl", "ndjson"):
+        return "json"
+    if extension == "csv":
+        return "csv"
+    raise ValueError(f"Unsupported file type '{extension}' (expected .csv or .json)")
+
+def parse_rows(data: str, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (row number, raw record) pairs; numbers match the file's lines or array items."""
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(data))
+        for record in reader:
+            yield reader.line_num, record
+        return
+    stripped = data.lstrip()
+    if stripped.startswith("["):
+        records = json.loads(stripped)
+        for number, record in enumerate(records, start=1):
+            yield number, record
+        return
+    for number, line in enumerate(data.splitlines(), start=1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, e
+
+def validate_row(record: Any) -> Dict[str, Any]:
+    """Normalize one raw record into a team dict; raises ValueError if it is unusable."""
+    if isinstance(record, Exception):
+        raise ValueError(f"invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("expected an object with a team_name")
+    team_name = record.get("team_name")
+    if not isinstance(team_name, str) or not team_name.strip():
+        raise ValueError("missing team_name")
+
+    members = record.get("members") or []
+    if isinstance(members, str):
+        members = members.split(CSV_MEMBER_SEPARATOR)
+    if not isinstance(members, list) or not all(isinstance(m, str) for m in members):
+        raise ValueError("members must be a list of names")
+
+    team = {"team_name": " ".join(team_name.split())}
+    for field in TEAM_FIELDS:
+        value = record.get(field)
+        if value not in (None, ""):
+            if not isinstance(value, str):
+                raise ValueError(f"{field} must be text")
+            team[field] = value.strip()
+    team["members"] = list(dict.fromkeys(m.strip() for m in members if m.strip()))
+    return team
+
+def _failed_rows(error: BulkWriteError, rows: List[Tuple[int, str]], ordered: bool) -> List[RowError]:
+    failed = [RowError(*rows[e["index"]], e.get("errmsg", "write failed")) for e in error.details.get("writeErrors", [])]
+    if ordered and failed:
+        # An ordered bulk_write stops at the first error; the rest of the batch never ran
+        first = error.details["writeErrors"][0]["index"]
+        failed += [RowError(*row, "not attempted after an earlier error") for row in rows[first + 1:]]
+    return failed
+
+def import_teams(teams_collection, memberships_collection, records: Iterable[Tuple[int, Any]],
+                 ordered: bool = False, batch_size: int = TEAM_IO_BATCH_SIZE) -> ImportReport:
+    """Upsert teams and their memberships from parsed rows, batch by batch.
+
+    Team fields in the file overwrite existing values; members are added, never removed.
+    With ordered=True the import stops at the first failing row.
+    """
+    ensure_indexes(teams_collection, memberships_collection)
+    counts = {"rows": 0, "teams_created": 0, "teams_updated": 0, "memberships_created": 0}
+    errors: List[RowError] = []
+    touched: Dict[str, None] = {}
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    stopped = False
+
+    def flush() -> None:
+        nonlocal stopped
+        now = datetime.utcnow()
+        team_ops, team_rows = [], []
+        for number, team in batch:
+            fields = {k: v for k, v in team.items() if k in TEAM_FIELDS}
+            team_ops.append(UpdateOne(
+                {"team_key": team_key(team["team_name"])},
+                {"$set": {**fields, "updated_at": now},
+                 "$setOnInsert": {"team_name": team["team_name"], "created_at": now}},
+                upsert=True
+            ))
+            team_rows.append((number, team["team_name"]))
+
+        failed_rows = set()
+        try:
+            result = teams_collection.bulk_write(team_ops, ordered=ordered)
+            counts["teams_created"] += result.upserted_count
+            counts["teams_updated"] += result.matched_count
+        except BulkWriteError as e:
+            counts["teams_created"] += e.details.get("nUpserted", 0)
+            counts["teams_updated"] += e.details.get("nMatched", 0)
+            failed = _failed_rows(e, team_rows, ordered)
+            errors.extend(failed)
+            failed_rows = {row.row for row in failed}
+            stopped = ordered
+
+        membership_ops, membership_rows = [], []
+        for number, team in batch:
+            if number in failed_rows:
+                continue
+            touched[team_key(team["team_name"])] = None
+            for name in team["members"]:
+                membership_ops.append(UpdateOne(
+                    {"team_key": team_key(team["team_name"]), "member_key": member_key(name)},
+                    {"$setOnInsert": _membership(team["team_name"], name)},
+                    upsert=True
+                ))
+                membership_rows.append((number, team["team_name"]))
+        if membership_ops:
+            try:
+                counts["memberships_created"] += memberships_collection.bulk_write(membership_ops, ordered=ordered).upserted_count
+            except BulkWriteError as e:
+                counts["memberships_created"] += e.details.get("nUpserted", 0)
+                errors.extend(_failed_rows(e, membership_rows, ordered))
+                stopped = stopped or ordered
+        batch.clear()
+
+    for number, record in records:
+        if stopped:
+            break
+        counts["rows"] += 1
+        try:
+            batch.append((number, validate_row(record)))
+        except ValueError as e:
+            name = record.get("team_name") if isinstance(record, dict) else None
+            errors.append(RowError(number, name, str(e)))
+            if ordered:
+                break
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch and not stopped:
+        flush()
+    return ImportReport(errors=errors, team_keys=list(touched), **counts)
+
+def iter_teams(teams_collection, memberships_collection, batch_size: int = TEAM_IO_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """Yield every team with its members, merging two team_key-ordered cursors."""
+    team_cursor = teams_collection.find(
+        {}, {"_id": 0, "team_name": 1, "team_key": 1, **{field: 1 for field in TEAM_FIELDS}}
+    ).sort("team_key", ASCENDING).batch_size(batch_size)
+    membership_cursor = memberships_collection.find(
+        {}, {"_id": 0, "team_key": 1, "name": 1}
+    ).sort([("team_key", ASCENDING), ("member_key", ASCENDING)]).batch_size(batch_size)
+
+    membership = next(membership_cursor, None)
+    for team in team_cursor:
+        key = team.pop("team_key")
+        # Skip memberships whose team no longer exists
+        while membership is not None and membership["team_key"] < key:
+            membership = next(membership_cursor, None)
+        members = []
+        while membership is not None and membership["team_key"] == key:
+            members.append(membership["name"])
+            membership = next(membership_cursor, None)
+        team["members"] = members
+        yield team
+
+def export_teams(teams_collection, memberships_collection, out: IO[str], fmt: str,
+                 batch_size: int = TEAM_IO_BATCH_SIZE) -> int:
+    """Write every team to out as CSV or a JSON array; returns the number of teams."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for team in iter_teams(teams_collection, memberships_collection, batch_size):
+            writer.writerow({**team, "members": CSV_MEMBER_SEPARATOR.join(team["members"])})
+            count += 1
+        return count
+
+    out.write("[")
+    for team in iter_teams(teams_collection, memberships_collection, batch_size):
+        out.write(("," if count else "") + "\n  " + json.dumps(team, ensure_ascii=False, default=str))
+        count += 1
+    out.write("\n]\n")
+    return count
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from pymongo import MongoClient
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Bulk import or export teams.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path", help="file to read (import) or write (export); '-' for stdin/stdout")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--ordered", action="store_true", help="import: stop at the first failing row")
+    parser.add_argument("--batch-size", type=int, default=TEAM_IO_BATCH_SIZE)
+    parser.add_argument("--uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017/"))
+    parser.add_argument("--db", default="discord_bot")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    db = MongoClient(args.uri)[args.db]
+    if args.command == "import":
+        if args.path == "-":
+            data = sys.stdin.read()
+        else:
+            with open(args.path, encoding="utf-8-sig") as f:
+                data = f.read()
+        report = import_teams(db["teams"], db["memberships"], parse_rows(data, fmt), args.ordered, args.batch_size)
+        for error in report.errors:
+            logger.error(f"Row {error.row} ({error.team_name or '?'}): {error.message}")
+        logger.info(f"Read {report.rows} row(s): {report.teams_created} team(s) created, {report.teams_updated} updated, "
+                    f"{report.memberships_created} membership(s) added, {len(report.errors)} error(s)")
+        sys.exit(1 if report.errors else 0)
+    else:
+        if args.path == "-":
+            count = export_teams(db["teams"], db["memberships"], sys.stdout, fmt, args.batch_size)
+        else:
+            with open(args.path, "w", encoding="utf-8", newline="") as f:
+                count = export_teams(db["teams"], db["memberships"], f, fmt, args.batch_size)
+        logger.info(f"Exported {count} team(s)")
@@ -0,0 +1,359 @@
+"""Async data-access layer for teams and memberships.
+
+pymongo is synchronous, so every query runs on a small thread pool and the
+handlers await it instead of blocking the discord.py event loop. When a
+CircuitBreaker is given, queries fail fast with DatabaseUnavailable while
+MongoDB is down. Any pymongo-compatible collections work, including mongomock
+for tests.
+
+Schema:
+    teams        {team_name, team_key, role, status, repo, created_at, updated_at}
+                 unique index on team_key; (status, team_key) and (role, team_key)
+                 with a case-insensitive collation for filtered listings
+    memberships  {team_key, team, name, member_key, role, updated_at}
+                 unique index on (team_key, member_key)
+
+team_key and member_key are normalized (case-folded) copies of the names,
+maintained on write. Data from the old single "Data" collection is moved
+over with:
+
+    python team_repository.py split
+"""
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from mongo_connection import CircuitBreaker
+
+logger = logging.getLogger("team_repository")
+
+MONGO_EXECUTOR_WORKERS = int(os.getenv("MONGO_EXECUTOR_WORKERS", "8"))
+TEAM_LIST_PAGE_SIZE = int(os.getenv("TEAM_LIST_PAGE_SIZE", "20"))
+
+# Status and role filters ignore case, like team names do
+FILTER_COLLATION = {"locale": "en", "strength": 2}
+
+TEAM_FIELDS = ("role", "status", "repo")
+
+def team_key(team_name: str) -> str:
+    """Normalized lookup key: whitespace-collapsed and case-folded."""
+    return " ".join(team_name.split()).casefold()
+
+member_key = team_key
+
+def ensure_indexes(teams_collection, memberships_collection) -> None:
+    """Create the lookup indexes if they are missing."""
+    teams_collection.create_index([("team_key", ASCENDING)], name="team_key_unique", unique=True)
+    for field in ("status", "role"):
+        teams_collection.create_index(
+            [(field, ASCENDING), ("team_key", ASCENDING)], name=f"{field}_team_key", collation=FILTER_COLLATION
+        )
+    memberships_collection.create_index(
+        [("team_key", ASCENDING), ("member_key", ASCENDING)], name="team_member_unique", unique=True
+    )
+
+def _membership(team_name: str, name: str, role: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "team_key": team_key(team_name),
+        "team": team_name,
+        "name": name,
+        "member_key": member_key(name),
+        "role": role,
+        "updated_at": datetime.utcnow()
+    }
+
+class TeamRepository:
+    """Team and membership queries, awaited from the bot's coroutines."""
+
+    def __init__(self, teams_collection, memberships_collection, executor: Optional[ThreadPoolExecutor] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.teams = teams_collection
+        self.memberships = memberships_collection
+        self.breaker = breaker
+        self._executor = executor or ThreadPoolExecutor(max_workers=MONGO_EXECUTOR_WORKERS, thread_name_prefix="mongo")
+        self._write_listeners: List[Callable[[str], Awaitable[None]]] = []
+
+    def add_write_listener(self, listener: Callable[[str], Awaitable[None]]) -> None:
+        """Register a coroutine called with the team_key after each successful write."""
+        self._write_listeners.append(listener)
+
+    async def _notify(self, key: str) -> None:
+        for listener in self._write_listeners:
+            try:
+                await listener(key)
+            except Exception as e:
+                logger.warning(f"Write listener failed for team '{key}': {e}")
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        if self.breaker is not None:
+            return await loop.run_in_executor(self._executor, functools.partial(self.breaker.call, func, *args, **kwargs))
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def close(self) -> None:
+        """Stop the query thread pool."""
+        self._executor.shutdown(wait=True)
+
+    async def ensure_indexes(self) -> None:
+        """Create the lookup indexes if they are missing."""
+        await self._run(ensure_indexes, self.teams, self.memberships)
+
+    def _member_names(self, key: str) -> List[str]:
+        cursor = self.memberships.find({"team_key": key}, {"name": 1, "_id": 0}).sort("member_key", ASCENDING)
+        return [doc["name"] for doc in cursor]
+
+    async def find_team(self, team_name: str) -> Optional[Dict[str, Any]]:
+        """Find a team by name, case-insensitively, with its member names."""
+        key = team_key(team_name)
+        def query():
+            doc = self.teams.find_one({"team_key": key})
+            if doc is not None:
+                doc["members"] = self._member_names(key)
+            return doc
+        return await self._run(query)
+
+    async def load_directory(self) -> Tuple[Dict[str, Dict[str, Any]], Dict[Any, str]]:
+        """Read every team with its members; also map each document _id to its team_key."""
+        def query():
+            teams, owners = {}, {}
+            for doc in self.teams.find():
+                doc["members"] = []
+                teams[doc["team_key"]] = doc
+                owners[doc["_id"]] = doc["team_key"]
+            for membership in self.memberships.find({}, {"team_key": 1, "name": 1}).sort([("team_key", ASCENDING), ("member_key", ASCENDING)]):
+                owners[membership["_id"]] = membership["team_key"]
+                if membership["team_key"] in teams:
+                    teams[membership["team_key"]]["members"].append(membership["name"])
+            return teams, owners
+        return await self._run(query)
+
+    async def watch_changes(self):
+        """Open a change stream over the teams and memberships collections."""
+        names = [self.teams.name, self.memberships.name]
+        return await self._run(
+            self.teams.database.watch,
+            [{"$match": {"ns.coll": {"$in": names}}}],
+            full_document="updateLookup"
+        )
+
+    async def team_exists(self, team_name: str) -> bool:
+        """True if a team with this name (ignoring case) exists."""
+        return await self._run(self.teams.find_one, {"team_key": team_key(team_name)}, {"_id": 1}) is not None
+
+    async def list_teams_page(self, after: Optional[str] = None, before: Optional[str] = None,
+                              status: Optional[str] = None, role: Optional[str] = None,
+                              limit: int = TEAM_LIST_PAGE_SIZE) -> Tuple[List[Dict[str, Any]], bool]:
+        """Fetch one page of teams after (or before) a team_key cursor, in team_key order.
+
+        Returns the page and whether more teams lie beyond it in the direction of travel.
+        """
+        query: Dict[str, Any] = {}
+        if status:
+            query["status"] = status
+        if role:
+            query["role"] = role
+        if before is not None:
+            query["team_key"] = {"$lt": before}
+        elif after is not None:
+            query["team_key"] = {"$gt": after}
+        direction = DESCENDING if before is not None else ASCENDING
+        collation = FILTER_COLLATION if status or role else None
+
+        def query_page():
+            cursor = self.teams.find(
+                query, {"team_name": 1, "team_key": 1, "status": 1, "role": 1, "_id": 0}, collation=collation
+            ).sort("team_key", direction).limit(limit + 1)
+            docs = list(cursor)
+            has_more = len(docs) > limit
+            docs = docs[:limit]
+            if direction == DESCENDING:
+                docs.reverse()
+            return docs, has_more
+        return await self._run(query_page)
+
+    async def create_team(self, team_info: Dict[str, Any]) -> bool:
+        """Insert a new team and its initial memberships; False if the name is already taken.
+
+        If the memberships cannot be written the team is deleted again before the error is raised.
+        """
+        team_name = team_info["team_name"]
+        members = team_info.get("members") or []
+        team_doc = {k: v for k, v in team_info.items() if k != "members"}
+        def write():
+            try:
+                # The unique team_key index makes the insert itself the existence check
+                self.teams.insert_one({**team_doc, "team_key": team_key(team_name)})
+            except DuplicateKeyError:
+                return False
+            if members:
+                unique_members = {member_key(name): name for name in members}.values()
+                try:
+                    self.memberships.insert_many([_membership(team_name, name) for name in unique_members])
+                except Exception:
+                    # Two collections can't be written atomically without a transaction, so undo the team
+                    self.memberships.delete_many({"team_key": team_key(team_name)})
+                    self.teams.delete_one({"team_key": team_key(team_name)})
+                    raise
+            return True
+        created = await self._run(write)
+        if created:
+            await self._notify(team_key(team_name))
+        return created
+
+    async def update_team_fields(self, team_name: str, fields: Dict[str, Any]) -> int:
+        """Set fields on the matching team and return the modified count."""
+        result = await self._run(
+            self.teams.update_one, {"team_key": team_key(team_name)}, {"$set": {**fields, "updated_at": datetime.utcnow()}}
+        )
+        if result.modified_count:
+            await self._notify(team_key(team_name))
+        return result.modified_count
+
+    async def set_members(self, team_name: str, members: List[str]) -> int:
+        """Replace the team's members; returns the number of teams matched."""
+        key = team_key(team_name)
+        def write():
+            team_doc = self.teams.find_one({"team_key": key}, {"team_name": 1})
+            if team_doc is None:
+                return 0
+            keys = [member_key(name) for name in members]
+            self.memberships.delete_many({"team_key": key, "member_key": {"$nin": keys}})
+            if members:
+                self.memberships.bulk_write([
+                    UpdateOne(
+                        {"team_key": key, "member_key": member_key(name)},
+                        {"$setOnInsert": _membership(team_doc["team_name"], name)},
+                        upsert=True
+                    )
+                    for name in members
+                ], ordered=False)
+            self.teams.update_one({"_id": team_doc["_id"]}, {"$set": {"updated_at": datetime.utcnow()}})
+            return 1
+        matched = await self._run(write)
+        if matched:
+            await self._notify(key)
+        return matched
+
+    async def assign_role(self, name: str, role: Optional[str], team: str) -> Optional[bool]:
+        """Record name's role in team; True if the member already existed, False if added, None if there is no such team.
+
+        Looks the team up, then upserts the membership. delete_team removes the team before its
+        memberships, so re-checking the team after an insert closes the race with a concurrent delete.
+        """
+        key = team_key(team)
+        def write():
+            team_doc = self.teams.find_one({"team_key": key}, {"team_name": 1})
+            if team_doc is None:
+                return None # never upsert a membership that belongs to no team
+            membership = _membership(team_doc["team_name"], name, role)
+            update = {
+                "$set": {"role": membership.pop("role"), "updated_at": membership.pop("updated_at")},
+                "$setOnInsert": membership
+            }
+            query = {"team_key": key, "member_key": membership["member_key"]}
+            before = self.memberships.find_one_and_update(
+                query, update, projection={"_id": 1}, upsert=True, return_document=ReturnDocument.BEFORE
+            )
+            if before is None and self.teams.find_one({"team_key": key}, {"_id": 1}) is None:
+                self.memberships.delete_one(query) # the team was deleted while we inserted
+                return None
+            return before is not None
+        existed = await self._run(write)
+        if existed is not None:
+            await self._notify(key)
+        return existed
+
+    async def remove_member(self, team_name: str, name: str) -> Optional[Dict[str, Any]]:
+        """Remove name from the team; returns the removed membership (team, name), or None."""
+        removed = await self._run(
+            self.memberships.find_one_and_delete,
+            {"team_key": team_key(team_name), "member_key": member_key(name)},
+            projection={"_id": 0, "team": 1, "name": 1}
+        )
+        if removed is not None:
+            await self._notify(team_key(team_name))
+        return removed
+
+    async def delete_team(self, team_name: str) -> int:
+        """Delete the matching team and its memberships; returns the deleted team count."""
+        key = team_key(team_name)
+        def write():
+            deleted = self.teams.delete_one({"team_key": key}).deleted_count
+            if deleted:
+                self.memberships.delete_many({"team_key": key})
+            return deleted
+        deleted = await self._run(write)
+        if deleted:
+            await self._notify(key)
+        return deleted
+
+def split_legacy_collection(legacy, teams_collection, memberships_collection, batch_size: int = 500) -> Dict[str, int]:
+    """Copy the old mixed Data collection into teams and memberships (idempotent)."""
+    ensure_indexes(teams_collection, memberships_collection)
+    team_ops, membership_ops = [], []
+    counts = {"teams": 0, "memberships": 0}
+
+    def flush(force: bool = False):
+        if team_ops and (force or len(team_ops) >= batch_size):
+            counts["teams"] += teams_collection.bulk_write(team_ops, ordered=False).upserted_count
+            team_ops.clear()
+        if membership_ops and (force or len(membership_ops) >= batch_size):
+            counts["memberships"] += memberships_collection.bulk_write(membership_ops, ordered=False).upserted_count
+            membership_ops.clear()
+
+    # Team documents first, so their fields win over teams implied by member records
+    for doc in legacy.find({"team_name": {"$type": "string"}}).batch_size(batch_size):
+        name = doc["team_name"]
+        fields = {k: doc[k] for k in TEAM_FIELDS if k in doc}
+        fields["created_at"] = doc.get("created_at", datetime.utcnow())
+        team_ops.append(UpdateOne({"team_key": team_key(name)}, {"$setOnInsert": {"team_name": name, **fields}}, upsert=True))
+        for member in doc.get("members") or []:
+            membership_ops.append(UpdateOne(
+                {"team_key": team_key(name), "member_key": member_key(member)},
+                {"$setOnInsert": _membership(name, member)},
+                upsert=True
+            ))
+        flush()
+    flush(force=True)
+
+    for doc in legacy.find({"team": {"$type": "string"}, "name": {"$type": "string"}}).batch_size(batch_size):
+        team, name = doc["team"], doc["name"]
+        team_ops.append(UpdateOne(
+            {"team_key": team_key(team)},
+            {"$setOnInsert": {"team_name": team, "created_at": doc.get("updated_at", datetime.utcnow())}},
+            upsert=True
+        ))
+        membership = _membership(team, name, doc.get("role"))
+        membership_ops.append(UpdateOne(
+            {"team_key": team_key(team), "member_key": member_key(name)},
+            {"$set": {"role": membership.pop("role"), "updated_at": membership.pop("updated_at")},
+             "$setOnInsert": membership},
+            upsert=True
+        ))
+        flush()
+    flush(force=True)
+    return counts
+
+if __name__ == '__main__':
+    import argparse
+    from pymongo import MongoClient
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Team collection maintenance.")
+    parser.add_argument("command", choices=["split"], help="move the legacy Data collection into teams/memberships")
+    parser.add_argument("--uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017/"))
+    parser.add_argument("--db", default="discord_bot")
+    parser.add_argument("--legacy", default="Data")
+    args = parser.parse_args()
+
+    db = MongoClient(args.uri)[args.db]
+    counts = split_legacy_collection(db[args.legacy], db["teams"], db["memberships"])
+    logger.info(f"Created {counts['teams']} team(s) and {counts['memberships']} membership(s); "
+                f"'{args.legacy}' was left untouched")
@@ -0,0 +1,360 @@
+"""Conversation sessions for multi-step wizards such as team creation.
+
+Sessions are keyed by (guild, channel, user), so any number of people can run
+a wizard at once, each in their own channel. A session expires after
+WIZARD_SESSION_TTL_SECONDS without an answer; a background sweeper drops
+expired sessions and reports them through an optional callback.
+
+With a SessionStore attached, progress is checkpointed to MongoDB so a restart
+or rolling deploy loses nothing. Checkpoints are debounced: changes made
+within WIZARD_CHECKPOINT_DEBOUNCE_MS are written together in one bulk_write,
+and a TTL index removes sessions nobody comes back to. At startup only the
+ids of live checkpoints are loaded; resume() reads a session back the next
+time its user speaks, and skips the database for everyone else.
+"""
+import asyncio
+import functools
+import logging
+import os
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from pymongo import ASCENDING, DeleteOne, ReplaceOne
+
+from mongo_connection import CircuitBreaker
+
+logger = logging.getLogger("wizard_sessions")
+
+WIZARD_SESSION_TTL_SECONDS = float(os.getenv("WIZARD_SESSION_TTL_SECONDS", "600"))
+WIZARD_SWEEP_INTERVAL_SECONDS = float(os.getenv("WIZARD_SWEEP_INTERVAL_SECONDS", "30"))
+WIZARD_MAX_SESSIONS = int(os.getenv("WIZARD_MAX_SESSIONS", "500"))
+WIZARD_MAX_SESSIONS_PER_GUILD = int(os.getenv("WIZARD_MAX_SESSIONS_PER_GUILD", "50"))
+WIZARD_CHECKPOINT_DEBOUNCE_MS = float(os.getenv("WIZARD_CHECKPOINT_DEBOUNCE_MS", "500"))
+
+SessionKey = Tuple[int, int, int] # (guild_id, channel_id, user_id); guild_id is 0 in DMs
+
+def session_key(message) -> SessionKey:
+    """Key for the wizard the message's author is running in its channel."""
+    return (message.guild.id if message.guild else 0, message.channel.id, message.author.id)
+
+class SessionLimitReached(Exception):
+    """Too many wizards are already active (globally or in this guild)."""
+
+class WizardSession:
+    """One user's progress through a fixed list of fields."""
+
+    __slots__ = ("key", "fields", "answers", "expires_at")
+
+    def __init__(self, key: SessionKey, fields: Sequence[str], expires_at: float):
+        self.key = key
+        self.fields = fields
+        self.answers: List[str] = []
+        self.expires_at = expires_at
+
+    @property
+    def current_field(self) -> Optional[str]:
+        """The field the next answer fills, or None once every field is answered."""
+        return self.fields[len(self.answers)] if len(self.answers) < len(self.fields) else None
+
+    def answer(self, text: str) -> Optional[str]:
+        """Record an answer for the current field and return the next field (None when done)."""
+        self.answers.append(text)
+        return self.current_field
+
+    @property
+    def data(self) -> Dict[str, str]:
+        return dict(zip(self.fields, self.answers))
+
+def _document_id(key: SessionKey) -> str:
+    return ":".join(map(str, key))
+
+class SessionStore:
+    """Debounced MongoDB checkpoints of wizard sessions."""
+
+    def __init__(self, collection, breaker: Optional[CircuitBreaker] = None,
+                 debounce_ms: float = WIZARD_CHECKPOINT_DEBOUNCE_MS):
+        self.collection = collection
+        self.breaker = breaker
+        self.debounce_seconds = debounce_ms / 1000
+        # Latest unsaved state per session: a document to upsert, or None to delete
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock() # one bulk_write at a time, so an older state never lands last
+        # Ids with a live checkpoint, so load() only queries for those; None until load_ids() has run
+        self._stored: Optional[Set[str]] = None
+        self._changed_while_loading: Optional[Dict[str, bool]] = None
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        if self.breaker is not None:
+            return await loop.run_in_executor(None, functools.partial(self.breaker.call, func, *args, **kwargs))
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def ensure_indexes(self) -> None:
+        # expires_at holds the exact expiry time, so the TTL monitor removes documents as soon as it passes
+        await self._run(self.collection.create_index, [("expires_at", ASCENDING)], name="expires_at_ttl",
+                        expireAfterSeconds=0)
+
+    async def load_ids(self) -> None:
+        """Learn which sessions have a live checkpoint (a projection-only read of the _ids)."""
+        now = datetime.utcnow()
+        self._changed_while_loading = {}
+        try:
+            ids = await self._run(lambda: {d["_id"] for d in self.collection.find({"expires_at": {"$gt": now}}, {"_id": 1})})
+            # Saves and deletes queued during the read may or may not be in it; the queued change wins
+            for document_id, live in self._changed_while_loading.items():
+                (ids.add if live else ids.discard)(document_id)
+            self._stored = ids
+        finally:
+            self._changed_while_loading = None
+        logger.info(f"{len(ids)} wizard session checkpoint(s) can be resumed")
+
+    def save(self, session: "WizardSession") -> None:
+        """Queue a checkpoint of session's answers and expiry."""
+        remaining = max(0.0, session.expires_at - time.monotonic())
+        self._queue(_document_id(session.key), {
+            "guild_id": session.key[0],
+            "channel_id": session.key[1],
+            "user_id": session.key[2],
+            "fields": list(session.fields),
+            "answers": list(session.answers),
+            "expires_at": datetime.utcnow() + timedelta(seconds=remaining)
+        })
+
+    def delete(self, key: SessionKey) -> None:
+        self._queue(_document_id(key), None)
+
+    def _queue(self, document_id: str, document: Optional[Dict[str, Any]]) -> None:
+        self._pending[document_id] = document
+        if self._stored is not None:
+            (self._stored.discard if document is None else self._stored.add)(document_id)
+        elif self._changed_while_loading is not None:
+            self._changed_while_loading[document_id] = document is not None
+        if self._flusher is None:
+            try:
+                self._flusher = asyncio.get_running_loop().create_task(self._flush_later())
+            except RuntimeError: # no event loop (scripts); the next flush() call writes it
+                pass
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.debounce_seconds)
+        finally:
+            self._flusher = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write every queued checkpoint in one bulk_write; also waits for a write already in flight."""
+        async with self._flush_lock:
+            await self._write_pending()
+
+    async def _write_pending(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        operations = [
+            DeleteOne({"_id": document_id}) if document is None
+            else ReplaceOne({"_id": document_id}, document, upsert=True)
+            for document_id, document in pending.items()
+        ]
+        try:
+            await self._run(self.collection.bulk_write, operations, ordered=False)
+            self.flushes += 1
+        except Exception as e:
+            self.failed_flushes += 1
+            logger.warning(f"Could not checkpoint {len(operations)} wizard session(s): {e}")
+            # Keep the failed state unless a newer change was queued meanwhile; the next change retries it
+            for document_id, document in pending.items():
+                self._pending.setdefault(document_id, document)
+
+    async def delete_guild(self, guild_id: int) -> Set[str]:
+        """Delete every checkpoint in a guild now; returns the ids of the live ones."""
+        now = datetime.utcnow()
+        live = set()
+        for document_id, document in list(self._pending.items()):
+            if document is not None and document["guild_id"] == guild_id:
+                live.add(document_id)
+                del self._pending[document_id]
+        if self._stored is not None:
+            self._stored = {document_id for document_id in self._stored if not document_id.startswith(f"{guild_id}:")}
+
+        def write():
+            cursor = self.collection.find({"guild_id": guild_id, "expires_at": {"$gt": now}}, {"_id": 1})
+            ids = {document["_id"] for document in cursor}
+            self.collection.delete_many({"guild_id": guild_id})
+            return ids
+
+        return live | await self._run(write)
+
+    async def load(self, key: SessionKey) -> Optional[Dict[str, Any]]:
+        """The checkpoint for key, or None if there is none or it has expired."""
+        document_id = _document_id(key)
+        if document_id in self._pending: # not written yet, so the queued state is the newest
+            document = self._pending[document_id]
+        elif self._stored is not None and document_id not in self._stored:
+            return None # most messages: this user has no wizard to resume
+        else:
+            document = await self._run(self.collection.find_one, {"_id": document_id})
+        # The TTL monitor only runs once a minute, so check the expiry here too
+        if document is None or document["expires_at"] <= datetime.utcnow():
+            if self._stored is not None:
+                self._stored.discard(document_id)
+            return None
+        return document
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pending": len(self._pending), "flushes": self.flushes, "failed_flushes": self.failed_flushes,
+                "resumable": len(self._stored) if self._stored is not None else None}
+
+class SessionManager:
+    """Active wizard sessions, ordered by expiry so sweeps only touch expired ones."""
+
+    def __init__(self, fields: Sequence[str], ttl: float = WIZARD_SESSION_TTL_SECONDS,
+                 max_sessions: int = WIZARD_MAX_SESSIONS, max_per_guild: int = WIZARD_MAX_SESSIONS_PER_GUILD,
+                 sweep_interval: float = WIZARD_SWEEP_INTERVAL_SECONDS,
+                 on_expire: Optional[Callable[[WizardSession], Awaitable[None]]] = None,
+                 store: Optional[SessionStore] = None):
+        self.fields = tuple(fields)
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_per_guild = max_per_guild
+        self.sweep_interval = sweep_interval
+        self.on_expire = on_expire
+        self.store = store
+        # Every touch moves a session to the end, so the front always expires first
+        self._sessions: "OrderedDict[SessionKey, WizardSession]" = OrderedDict()
+        self._per_guild: Counter = Counter()
+        self._sweeper: Optional[asyncio.Task] = None
+        self.expired = 0
+        self.resumed = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, key: SessionKey) -> Optional[WizardSession]:
+        """Return the live session for key, refreshing its expiry, or None."""
+        session = self._sessions.get(key)
+        if session is None:
+            return None
+        now = time.monotonic()
+        if session.expires_at <= now:
+            self._remove(key)
+            self.expired += 1
+            return None
+        session.expires_at = now + self.ttl
+        self._sessions.move_to_end(key)
+        return session
+
+    async def resume(self, key: SessionKey) -> Optional[WizardSession]:
+        """Like get(), but on a miss rehydrate the session from the store (e.g. after a restart)."""
+        session = self.get(key)
+        if session is not None or self.store is None:
+            return session
+        try:
+            document = await self.store.load(key)
+        except Exception as e:
+            logger.warning(f"Could not load wizard session {key}: {e}")
+            return None
+        if document is None or tuple(document["fields"]) != self.fields:
+            return None # nothing saved, or saved by a version of the wizard with other fields
+        if key in self._sessions: # started while the lookup was in flight
+            return self.get(key)
+        session = WizardSession(key, self.fields, time.monotonic() + self.ttl)
+        session.answers = list(document["answers"])
+        # Resumed sessions were admitted before the restart, so the limits are not applied again
+        self._sessions[key] = session
+        self._per_guild[key[0]] += 1
+        self.resumed += 1
+        self.store.save(session)
+        return session
+
+    def answer(self, session: WizardSession, text: str) -> Optional[str]:
+        """Record an answer on session, checkpoint it, and return the next field (None when done)."""
+        next_field = session.answer(text)
+        if self.store is not None and next_field is not None:
+            self.store.save(session)
+        return next_field
+
+    def start(self, key: SessionKey) -> WizardSession:
+        """Start (or restart) the wizard for key; raises SessionLimitReached when full."""
+        self.end(key)
+        self.sweep()
+        guild_id = key[0]
+        if len(self._sessions) >= self.max_sessions:
+            raise SessionLimitReached(f"{len(self._sessions)} wizards are already running")
+        if self._per_guild[guild_id] >= self.max_per_guild:
+            raise SessionLimitReached(f"{self._per_guild[guild_id]} wizards are already running in this server")
+        session = WizardSession(key, self.fields, time.monotonic() + self.ttl)
+        self._sessions[key] = session
+        self._per_guild[guild_id] += 1
+        if self.store is not None:
+            self.store.save(session)
+        return session
+
+    def end(self, key: SessionKey) -> Optional[WizardSession]:
+        """Drop the session for key and return it, if there was one."""
+        if key not in self._sessions:
+            return None
+        if self.store is not None:
+            self.store.delete(key)
+        return self._remove(key)
+
+    async def end_guild(self, guild_id: int) -> int:
+        """Drop every session in a guild, including checkpoints not resumed yet; returns how many there were."""
+        keys = [key for key in self._sessions if key[0] == guild_id]
+        for key in keys:
+            self._remove(key)
+        if self.store is None:
+            return len(keys)
+        stored = await self.store.delete_guild(guild_id)
+        return len(stored | {_document_id(key) for key in keys})
+
+    def _remove(self, key: SessionKey) -> WizardSession:
+        session = self._sessions.pop(key)
+        self._per_guild[key[0]] -= 1
+        if not self._per_guild[key[0]]:
+            del self._per_guild[key[0]]
+        return session
+
+    def sweep(self) -> List[WizardSession]:
+        """Remove and return every expired session."""
+        now = time.monotonic()
+        expired = []
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if session.expires_at > now:
+                break
+            expired.append(self._remove(key))
+        self.expired += len(expired)
+        return expired
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            for session in self.sweep():
+                if self.on_expire is not None:
+                    try:
+                        await self.on_expire(session)
+                    except Exception as e:
+                        logger.warning(f"Expiry callback failed for session {session.key}: {e}")
+
+    def start_sweeper(self) -> None:
+        """Start the background sweeper (idempotent)."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    def stop_sweeper(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"active": len(self._sessions), "guilds": len(self._per_guild), "expired": self.expired,
+                 "resumed": self.resumed}
+        if self.store is not None:
+            stats["checkpoints"] = self.store.stats()
+        return stats